@@ -1,5 +1,7 @@
 from django.contrib import admin
 
+from .deletion import soft_delete_recipes
+from .mixins import SoftDeleteAdminMixin
 from .models import (Favorite, Follow, Ingredient, IngredientInRecipe,
                      Purchase, Recipe, Tag)
 
@@ -9,7 +11,8 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('^name',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    soft_delete = staticmethod(soft_delete_recipes)
     list_display = ('author', 'name', 'favorited')
     list_filter = ('author', 'name', 'tags')
     exclude = ('ingredients',)
@@ -0,0 +1,108 @@
+import json
+import logging
+from contextlib import nullcontext
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.query_budget import get_query_budget, should_track
+from foodgram.routers import use_primary
+
+BATCH_MAX_REQUESTS = 20
+BATCH_VIEW_NAME = 'api:batch'
+
+logger = logging.getLogger(__name__)
+
+
+class Batch:
+    def __init__(self, request):
+        self.request = request
+        self.cache = {}
+
+    def run(self, items):
+        outer = self.request._request
+        if all(item['method'] in SAFE_METHODS for item in items):
+            # A read-only batch may be served by replicas like plain GETs.
+            outer.replica_read_only = True
+            use_primary(getattr(outer, 'replica_sticky', True))
+        return [self.run_one(item) for item in items]
+
+    def run_one(self, item):
+        method, path = item['method'], item['path']
+        if method not in SAFE_METHODS:
+            self.cache.clear()
+            return self.dispatch(method, path, item.get('body'))
+        key = (method, path)
+        if key not in self.cache:
+            self.cache[key] = self.dispatch(method, path, item.get('body'))
+        return self.cache[key]
+
+    def dispatch(self, method, path, body):
+        url = urlsplit(path)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {'status': 404, 'body': {'detail': 'Страница не найдена.'}}
+        if match.view_name == BATCH_VIEW_NAME:
+            return {'status': 400, 'body': {
+                'detail': 'Вложенные пакетные запросы не поддерживаются.'
+            }}
+        request = self.build_request(method, url, body, match)
+        tracker = (get_query_budget(match.func, request)
+                   if should_track() else None)
+        try:
+            with tracker or nullcontext():
+                response = match.func(request, *match.args, **match.kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+                content = self.decode(response)
+            if tracker is not None:
+                tracker.check()
+        except Http404:
+            return {'status': 404, 'body': {'detail': 'Страница не найдена.'}}
+        except Exception:
+            logger.exception('Ошибка в пакетном запросе %s %s', method, path)
+            return {'status': 500, 'body': {'detail': 'Ошибка сервера.'}}
+        return {'status': response.status_code, 'body': content}
+
+    def build_request(self, method, url, body, match):
+        outer = self.request._request
+        data = json.dumps(body).encode() if body is not None else b''
+        request = HttpRequest()
+        request.method = method
+        request.path = request.path_info = url.path
+        request.META = outer.META.copy()
+        request.META.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(data)),
+            'HTTP_ACCEPT': 'application/json',
+        })
+        request.GET = QueryDict(url.query)
+        request.COOKIES = outer.COOKIES
+        request.resolver_match = match
+        request._stream = BytesIO(data)
+        request._read_started = False
+        if hasattr(outer, 'session'):
+            request.session = outer.session
+        # Authenticated once for the whole batch.
+        request._force_auth_user = self.request.user
+        request._force_auth_token = self.request.auth
+        return request
+
+    @staticmethod
+    def decode(response):
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        if not content:
+            return None
+        if response.get('Content-Type', '').startswith('application/json'):
+            return json.loads(content)
+        return content.decode(response.charset)
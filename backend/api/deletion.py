@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from jobs.registry import enqueue
+
+from .models import Recipe, Tombstone, User
+from .tasks import purge_recipes, purge_user
+
+
+def hide_recipes(queryset, now):
+    recipe_ids = list(queryset.values_list('id', flat=True))
+    queryset.update(deleted_at=now)
+    Tombstone.objects.bulk_create(
+        (Tombstone(model='recipe', object_id=recipe_id)
+         for recipe_id in recipe_ids),
+        batch_size=1000,
+    )
+    return recipe_ids
+
+
+def soft_delete_recipes(queryset):
+    with transaction.atomic():
+        recipe_ids = hide_recipes(queryset, timezone.now())
+        if recipe_ids:
+            enqueue(purge_recipes, recipe_ids=recipe_ids)
+    return len(recipe_ids)
+
+
+def soft_delete_users(queryset):
+    now = timezone.now()
+    with transaction.atomic():
+        user_ids = list(queryset.values_list('id', flat=True))
+        # Frees the unique email and username for a new registration
+        # while the account waits for purge_user. '#' fails both the
+        # username and the email validators, so no one can register the
+        # placeholder first.
+        placeholder = Concat(Value('deleted#'), Cast('id', CharField()))
+        User.objects.filter(id__in=user_ids).update(
+            deleted_at=now, is_active=False,
+            username=placeholder, email=placeholder,
+        )
+        Token.objects.filter(user_id__in=user_ids).delete()
+        hide_recipes(Recipe.objects.filter(author_id__in=user_ids), now)
+        for user_id in user_ids:
+            enqueue(purge_user, user_id=user_id)
+    return len(user_ids)
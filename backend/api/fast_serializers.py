@@ -0,0 +1,135 @@
+from .models import Favorite, Follow, Purchase, Recipe
+from .snapshots import get_snapshots
+
+RECIPE_FIELDS = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
+                 'is_in_shopping_cart', 'name', 'image', 'text',
+                 'cooking_time')
+CARD_FIELDS = ('id', 'name', 'image', 'cooking_time')
+# Flags that depend on the requesting user rather than on the recipe.
+PERSONAL_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+
+image_storage = Recipe._meta.get_field('image').storage
+
+
+def image_url(name, request=None):
+    if not name:
+        return None
+    url = image_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def recipe_card(recipe, request=None):
+    return {
+        'id': recipe['id'],
+        'name': recipe['name'],
+        'image': image_url(recipe['image'], request),
+        'cooking_time': recipe['cooking_time'],
+    }
+
+
+def serialize_recipe_cards(queryset, request=None):
+    return [
+        recipe_card(recipe, request)
+        for recipe in queryset.values(*CARD_FIELDS)
+    ]
+
+
+def recipe_cards_by_author(author_ids, limit=None, request=None):
+    # One query for a whole page of authors; recipes_limit is applied
+    # while grouping since Django cannot filter on a window function.
+    cards = {author_id: [] for author_id in author_ids}
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    for recipe in queryset.values('author_id', *CARD_FIELDS):
+        author_cards = cards[recipe['author_id']]
+        if limit is None or len(author_cards) < limit:
+            author_cards.append(recipe_card(recipe, request))
+    return cards
+
+
+class FastRecipeListSerializer:
+    def __init__(self, request, fields=None, expand=(), personal=True):
+        self.request = request
+        self.personal = personal
+        self.fields = [
+            name for name in RECIPE_FIELDS
+            if (fields is None or name in fields)
+            and (personal or name not in PERSONAL_FIELDS)
+        ]
+        self.expand = set(RECIPE_FIELDS) if fields is None else set(expand)
+
+    def is_wanted(self, name):
+        return name in self.fields
+
+    def is_expanded(self, name):
+        return name in self.fields and name in self.expand
+
+    def serialize(self, recipe_ids):
+        return self.serialize_snapshots(get_snapshots(recipe_ids))
+
+    def serialize_snapshots(self, snapshots):
+        recipe_ids = [snapshot['id'] for snapshot in snapshots]
+        author_ids = {snapshot['author']['id'] for snapshot in snapshots}
+        followed = (self.get_followed(author_ids)
+                    if self.personal and self.is_expanded('author')
+                    else set())
+        favorited, in_cart = self.get_user_flags(recipe_ids)
+
+        data = []
+        for snapshot in snapshots:
+            recipe_id = snapshot['id']
+            values = {
+                'id': recipe_id,
+                'is_favorited': recipe_id in favorited,
+                'is_in_shopping_cart': recipe_id in in_cart,
+                'name': snapshot['name'],
+                'image': image_url(snapshot['image'], self.request),
+                'text': snapshot['text'],
+                'cooking_time': snapshot['cooking_time'],
+            }
+            if self.is_expanded('tags'):
+                values['tags'] = snapshot['tags']
+            else:
+                values['tags'] = [tag['id'] for tag in snapshot['tags']]
+            if self.is_expanded('ingredients'):
+                values['ingredients'] = snapshot['ingredients']
+            else:
+                values['ingredients'] = [
+                    {'id': ingredient['id'], 'amount': ingredient['amount']}
+                    for ingredient in snapshot['ingredients']
+                ]
+            author = snapshot['author']
+            if self.is_expanded('author') and not self.personal:
+                values['author'] = author
+            elif self.is_expanded('author'):
+                values['author'] = {
+                    **author, 'is_subscribed': author['id'] in followed
+                }
+            else:
+                values['author'] = author['id']
+            data.append({name: values[name] for name in self.fields})
+        return data
+
+    def get_followed(self, author_ids):
+        user = self.request.user
+        if not user.is_authenticated:
+            return set()
+        return set(Follow.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True))
+
+    def get_user_flags(self, recipe_ids):
+        user = self.request.user
+        favorited, in_cart = set(), set()
+        if not user.is_authenticated or not recipe_ids:
+            return favorited, in_cart
+        if self.is_wanted('is_favorited'):
+            favorited = set(Favorite.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+        if self.is_wanted('is_in_shopping_cart'):
+            in_cart = set(Purchase.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+        return favorited, in_cart
@@ -1,6 +1,19 @@
 import django_filters as filters
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
 
-from .models import Ingredient, Recipe, User
+from .models import Ingredient, IngredientIndex, Recipe, Tag, User
+
+Through = Recipe.ingredients.through
+
+
+def recipes_with(ingredient_ids):
+    return Through.objects.filter(
+        ingredientinrecipe__ingredient_id__in=ingredient_ids
+    ).values('recipe_id')
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class IngredientNameFilter(filters.FilterSet):
@@ -12,8 +25,12 @@ class IngredientNameFilter(filters.FilterSet):
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    # Validates the requested slugs with one lookup on the tag table
+    # instead of collecting every slug in use across all recipes.
+    tags = filters.ModelMultipleChoiceFilter(
+        field_name='tags__slug',
+        to_field_name='slug',
+        queryset=Tag.objects.all(),
     )
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all()
@@ -24,10 +41,28 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.NumberFilter(
         method='get_is_in_shopping_cart'
     )
+    ingredients = NumberInFilter(
+        method='get_with_ingredients'
+    )
+    exclude_ingredients = NumberInFilter(
+        method='get_without_ingredients'
+    )
+    pantry = NumberInFilter(
+        method='get_from_pantry'
+    )
+    coverage = filters.NumberFilter(
+        method='get_coverage'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'popular'), ('trending', 'trending')),
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'ingredients', 'exclude_ingredients', 'pantry', 'coverage',
+                  'ordering']
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -40,3 +75,48 @@ class RecipeFilter(filters.FilterSet):
         if value:
             return queryset.filter(purchases__user=user)
         return queryset
+
+    def get_with_ingredients(self, queryset, name, value):
+        ingredient_ids = {int(ingredient_id) for ingredient_id in value}
+        counts = IngredientIndex.objects.counts_for(ingredient_ids)
+        if len(counts) < len(ingredient_ids):
+            return queryset.none()
+        # The index keeps only per-ingredient counts: they rule out unused
+        # ingredients and put the rarest semi-join first. Recipe ids stay
+        # in the database, so a common ingredient costs no bind list.
+        for ingredient_id in sorted(ingredient_ids, key=counts.get):
+            queryset = queryset.filter(id__in=recipes_with([ingredient_id]))
+        return queryset
+
+    def get_without_ingredients(self, queryset, name, value):
+        return queryset.exclude(id__in=recipes_with(
+            {int(ingredient_id) for ingredient_id in value}
+        ))
+
+    def get_from_pantry(self, queryset, name, value):
+        coverage = float(self.form.cleaned_data.get('coverage') or 1)
+        coverage = min(max(coverage, 0.01), 1)
+        ingredient_ids = {int(ingredient_id) for ingredient_id in value}
+        hits = recipes_with(ingredient_ids).filter(
+            recipe_id=OuterRef('pk')
+        ).order_by().values('recipe_id').annotate(
+            hits=Count('ingredientinrecipe__ingredient_id', distinct=True)
+        ).values('hits')
+        # ingredients_count bounds the candidates before the per-recipe
+        # count runs.
+        return queryset.filter(
+            ingredients_count__gt=0,
+            ingredients_count__lte=len(ingredient_ids) / coverage,
+        ).annotate(
+            pantry_hits=Subquery(hits, output_field=IntegerField())
+        ).filter(pantry_hits__gte=coverage * F('ingredients_count'))
+
+    def get_coverage(self, queryset, name, value):
+        return queryset
+
+    def get_ordering(self, queryset, name, value):
+        # Every recipe has a score row: the filter turns the join into an
+        # inner join, and the sort keys match the (score, recipe) index.
+        return queryset.filter(score__isnull=False).order_by(
+            f'-score__{value}', '-id'
+        )
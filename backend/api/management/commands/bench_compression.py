@@ -0,0 +1,98 @@
+import json
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.renderers import FastJSONRenderer
+from foodgram.compression import BrotliEncoder, GzipEncoder, brotli
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def load_payloads(path):
+    with open(path, 'rb') as dump_file:
+        raw = dump_file.read()
+    ingredients = [
+        {'id': item['pk'], **{
+            name: item['fields'][name]
+            for name in ('name', 'measurement_unit')
+        }}
+        for item in json.loads(raw) if item['model'] == 'api.ingredient'
+    ]
+    if not ingredients:
+        raise CommandError('В дампе нет ингредиентов.')
+    renderer = FastJSONRenderer()
+    # Same framing as StreamingListMixin.stream.
+    chunks = [
+        (b',' if start else b'[') + renderer.render(
+            ingredients[start:start + STREAM_CHUNK_SIZE]
+        )[1:-1]
+        for start in range(0, len(ingredients), STREAM_CHUNK_SIZE)
+    ] + [b']']
+    shopping_list = ''.join(
+        f'{item["name"]}: {index % 900 + 1} {item["measurement_unit"]}\n'
+        for index, item in enumerate(ingredients[:60])
+    ).encode()
+    return [
+        ('dump.json', [raw]),
+        ('/api/ingredients/', [renderer.render(ingredients)]),
+        ('/api/ingredients/ (поток)', chunks),
+        ('список покупок', [shopping_list]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет сжатие ответов API на данных из dump.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dump', default=os.path.join(settings.BASE_DIR, 'dump.json')
+        )
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--mbps', type=float, default=10,
+                            help='Пропускная способность канала, Мбит/с')
+
+    def handle(self, *args, **options):
+        encoders = [(f'gzip-{level}', GzipEncoder(level))
+                    for level in (1, 6, 9)]
+        if brotli is not None:
+            encoders += [(f'br-{quality}', BrotliEncoder(quality))
+                         for quality in (1, 5, 11)]
+        else:
+            self.stderr.write('brotli не установлен, замер только gzip')
+        bytes_per_ms = options['mbps'] * 1e6 / 8 / 1000
+        self.stdout.write(
+            f'{"ответ":<28} {"сжатие":<10} {"байт":>10} {"доля":>6} '
+            f'{"сжатие, мс":>11} {"передача, мс":>13} {"итого, мс":>10}'
+        )
+        for name, chunks in load_payloads(options['dump']):
+            size = sum(len(chunk) for chunk in chunks)
+            transfer = size / bytes_per_ms
+            self.stdout.write(
+                f'{name:<28} {"identity":<10} {size:>10} {1:>6.2f} '
+                f'{0:>11.2f} {transfer:>13.1f} {transfer:>10.1f}'
+            )
+            for label, encoder in encoders:
+                compressed, elapsed = self.measure(
+                    encoder, chunks, options['repeat']
+                )
+                transfer = compressed / bytes_per_ms
+                self.stdout.write(
+                    f'{name:<28} {label:<10} {compressed:>10} '
+                    f'{compressed / size:>6.2f} {elapsed:>11.2f} '
+                    f'{transfer:>13.1f} {elapsed + transfer:>10.1f}'
+                )
+
+    def measure(self, encoder, chunks, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            if len(chunks) == 1:
+                size = len(encoder.compress(chunks[0]))
+            else:
+                size = sum(len(data) for data in encoder.stream(chunks))
+            timings.append((time.perf_counter() - started) * 1000)
+        return size, statistics.median(timings)
@@ -0,0 +1,141 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.partitioning import (HASH_PARTITIONS, get_partitions,
+                              supports_partitioning)
+
+SCHEMA = 'bench_partitioning'
+LOAD_BATCH_SIZE = 1000000
+LOOKUPS = {
+    'по пользователю': 'SELECT recipe_id FROM {table} WHERE user_id = %s',
+    'пара': ('SELECT 1 FROM {table} WHERE user_id = %s AND recipe_id = %s '
+             'LIMIT 1'),
+}
+
+
+def percentile(timings, share):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def count_scans(plan):
+    nodes = 1 if plan['Node Type'].endswith('Scan') else 0
+    return nodes + sum(count_scans(child) for child in plan.get('Plans', []))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает обычную и секционированную по user_id таблицу '
+            'избранного: размер индексов и задержку выборок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Строк в таблице, например 100000000')
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--partitions', type=int,
+                            default=HASH_PARTITIONS)
+        parser.add_argument('--lookups', type=int, default=2000)
+        parser.add_argument('--keep', action='store_true',
+                            help='Не удалять схему с данными после замера')
+
+    def handle(self, *args, **options):
+        if not supports_partitioning(connection):
+            raise CommandError('Секционирование доступно в PostgreSQL 11+.')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {SCHEMA}')
+            try:
+                tables = self.create_tables(cursor, options)
+                for table in tables:
+                    self.load(cursor, table, options)
+                self.report(cursor, tables, options)
+            finally:
+                if not options['keep']:
+                    cursor.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+
+    def create_tables(self, cursor, options):
+        columns = ('id bigserial, user_id integer NOT NULL, '
+                   'recipe_id integer NOT NULL, '
+                   'date_added timestamptz NOT NULL DEFAULT now()')
+        cursor.execute(f'CREATE TABLE {SCHEMA}.plain ({columns})')
+        cursor.execute(
+            f'CREATE TABLE {SCHEMA}.hashed ({columns}) '
+            f'PARTITION BY HASH (user_id)'
+        )
+        for remainder in range(options['partitions']):
+            cursor.execute(
+                f'CREATE TABLE {SCHEMA}.hashed_p{remainder} PARTITION OF '
+                f'{SCHEMA}.hashed FOR VALUES WITH '
+                f'(MODULUS {options["partitions"]}, REMAINDER {remainder})'
+            )
+        return ['plain', 'hashed']
+
+    def load(self, cursor, table, options):
+        started = time.perf_counter()
+        # n maps to a distinct (user, recipe) pair, so both tables get the
+        # same rows and the unique constraint holds.
+        for start in range(0, options['rows'], LOAD_BATCH_SIZE):
+            stop = min(start + LOAD_BATCH_SIZE, options['rows'])
+            cursor.execute(
+                f'INSERT INTO {SCHEMA}.{table} (user_id, recipe_id) '
+                f'SELECT 1 + n %% %s, 1 + n / %s '
+                f'FROM generate_series(%s, %s) n',
+                [options['users'], options['users'], start, stop - 1],
+            )
+        primary_key = 'id' if table == 'plain' else 'id, user_id'
+        cursor.execute(
+            f'ALTER TABLE {SCHEMA}.{table} ADD PRIMARY KEY ({primary_key})'
+        )
+        cursor.execute(
+            f'ALTER TABLE {SCHEMA}.{table} ADD CONSTRAINT {table}_unique '
+            f'UNIQUE (user_id, recipe_id)'
+        )
+        cursor.execute(
+            f'CREATE INDEX {table}_recipe ON {SCHEMA}.{table} (recipe_id)'
+        )
+        cursor.execute(f'ANALYZE {SCHEMA}.{table}')
+        self.stdout.write(
+            f'{table}: загружено за {time.perf_counter() - started:.1f} с'
+        )
+
+    def index_size(self, cursor, table):
+        relations = get_partitions(table, cursor) or [table]
+        cursor.execute(
+            'SELECT sum(pg_indexes_size(c.oid)) FROM pg_class c '
+            'JOIN pg_namespace n ON n.oid = c.relnamespace '
+            'WHERE n.nspname = %s AND c.relname = ANY(%s)',
+            [SCHEMA, relations],
+        )
+        return cursor.fetchone()[0] or 0
+
+    def report(self, cursor, tables, options):
+        recipes = options['rows'] // options['users'] + 1
+        users = [random.randint(1, options['users'])
+                 for _ in range(options['lookups'])]
+        self.stdout.write(
+            f'{"таблица":<8} {"выборка":<16} {"индексы, МБ":>12} '
+            f'{"p50, мс":>8} {"p95, мс":>8} {"p99, мс":>8} {"секций":>7}'
+        )
+        for table in tables:
+            size = self.index_size(cursor, table) / 1024 / 1024
+            for label, sql in LOOKUPS.items():
+                sql = sql.format(table=f'{SCHEMA}.{table}')
+                params = [[user] if sql.count('%s') == 1
+                          else [user, random.randint(1, recipes)]
+                          for user in users]
+                timings = []
+                for values in params:
+                    started = time.perf_counter()
+                    cursor.execute(sql, values)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - started) * 1000)
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params[0])
+                scans = count_scans(cursor.fetchone()[0][0]['Plan'])
+                self.stdout.write(
+                    f'{table:<8} {label:<16} {size:>12.1f} '
+                    f'{percentile(timings, 0.5):>8.3f} '
+                    f'{percentile(timings, 0.95):>8.3f} '
+                    f'{percentile(timings, 0.99):>8.3f} {scans:>7}'
+                )
@@ -0,0 +1,107 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef, Prefetch
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.fast_serializers import FastRecipeListSerializer
+from api.models import Favorite, Follow, Purchase, Recipe, User
+from api.renderers import FastJSONRenderer
+from api.serializers import ListRecipeSerializer, get_sparse_fields
+
+
+def annotate_for_list(queryset, request):
+    # Prefetches for ListRecipeSerializer, the reference implementation
+    # the snapshot serializer is checked against.
+    fields, expand = get_sparse_fields(request)
+    user = request.user
+
+    def wanted(name):
+        return fields is None or name in fields
+
+    def expanded(name):
+        return fields is None or name in expand
+
+    if wanted('author') and expanded('author'):
+        if user.is_authenticated:
+            queryset = queryset.prefetch_related(Prefetch(
+                'author',
+                queryset=User.objects.annotate(is_subscribed=Exists(
+                    Follow.objects.filter(
+                        user=user, author=OuterRef('pk')
+                    )
+                ))
+            ))
+        else:
+            queryset = queryset.select_related('author')
+    if wanted('tags'):
+        queryset = queryset.prefetch_related('tags')
+    if wanted('ingredients'):
+        queryset = queryset.prefetch_related(
+            'ingredients__ingredient' if expanded('ingredients')
+            else 'ingredients'
+        )
+    if not wanted('text'):
+        queryset = queryset.defer('text')
+    if user.is_authenticated:
+        if wanted('is_favorited'):
+            queryset = queryset.annotate(is_favorited_by_user=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        if wanted('is_in_shopping_cart'):
+            queryset = queryset.annotate(
+                is_in_user_shopping_cart=Exists(Purchase.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                ))
+            )
+    return queryset
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стоимость сериализации списка рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--user', type=int, default=None)
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        if options['user']:
+            request.user = User.objects.get(id=options['user'])
+        else:
+            from django.contrib.auth.models import AnonymousUser
+            request.user = AnonymousUser()
+        recipe_ids = list(Recipe.objects.values_list(
+            'id', flat=True
+        )[:options['limit']])
+        if not recipe_ids:
+            raise CommandError('Нет рецептов для замера.')
+
+        def drf():
+            recipes = annotate_for_list(
+                Recipe.objects.filter(id__in=recipe_ids), request
+            )
+            data = ListRecipeSerializer(
+                recipes, many=True, context={'request': request}
+            ).data
+            return JSONRenderer().render(data)
+
+        def fast():
+            data = FastRecipeListSerializer(request).serialize(recipe_ids)
+            return FastJSONRenderer().render(data)
+
+        if drf() != fast():
+            self.stderr.write('Результаты сериализации различаются!')
+        for name, func in (('DRF', drf), ('fast', fast)):
+            started = time.process_time()
+            for _ in range(options['repeat']):
+                func()
+            elapsed = time.process_time() - started
+            per_item = elapsed / options['repeat'] / len(recipe_ids) * 1e6
+            self.stdout.write(
+                f'{name:>5}: {per_item:8.1f} мкс CPU на рецепт '
+                f'({len(recipe_ids)} рецептов, {options["repeat"]} повторов)'
+            )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Recipe
+from api.snapshots import (SNAPSHOT_BATCH_SIZE, build_snapshots, loads,
+                           rebuild_snapshots)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет снимки рецептов с данными в таблицах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Пересобрать расходящиеся снимки')
+        parser.add_argument('--batch-size', type=int,
+                            default=SNAPSHOT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        missing, stale = [], []
+        last_id = 0
+        total = 0
+        while True:
+            rows = list(Recipe.objects.filter(id__gt=last_id).order_by(
+                'id'
+            ).values_list('id', 'snapshot')[:options['batch_size']])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            total += len(rows)
+            expected = build_snapshots([recipe_id for recipe_id, _ in rows])
+            for recipe_id, snapshot in rows:
+                if not snapshot:
+                    missing.append(recipe_id)
+                elif loads(snapshot) != expected.get(recipe_id):
+                    stale.append(recipe_id)
+        self.stdout.write(
+            f'Проверено рецептов: {total}, без снимка: {len(missing)}, '
+            f'устаревших: {len(stale)}'
+        )
+        if stale:
+            self.stdout.write(
+                'Устаревшие: ' + ', '.join(map(str, stale[:50]))
+            )
+        if options['fix']:
+            rebuild_snapshots(missing + stale)
+            self.stdout.write(f'Пересобрано: {len(missing) + len(stale)}')
+        elif stale:
+            raise CommandError('Снимки расходятся с данными.')
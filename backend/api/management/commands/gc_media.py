@@ -0,0 +1,61 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Recipe
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет изображения рецептов, на которые не ссылается '
+            'ни один рецепт')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Не трогать файлы моложе указанного возраста',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        storage = field.storage
+        # Soft-deleted recipes still own their images until purged.
+        referenced = set(Recipe.all_objects.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator())
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        root = field.upload_to.rstrip('/')
+        removed = kept = 0
+        try:
+            names = list(walk(storage, root))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if name in referenced:
+                kept += 1
+                continue
+            if storage.get_modified_time(name) > cutoff:
+                kept += 1
+                continue
+            # The snapshot above may be stale: a recipe saved since then
+            # could have reused this file through content addressing.
+            if Recipe.all_objects.filter(image=name).exists():
+                kept += 1
+                continue
+            if not options['dry_run']:
+                storage.delete(name)
+            removed += 1
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} файлов: {removed}, оставлено: {kept}'
+        ))
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Recipe
+from api.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = ('Переносит изображения рецептов из локального каталога '
+            'в текущее хранилище медиафайлов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', default=settings.MEDIA_ROOT,
+            help='Каталог, из которого копируются файлы',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        source = FileSystemStorage(location=options['source'])
+        target = Recipe._meta.get_field('image').storage
+        names = Recipe.all_objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().order_by()
+        copied = missing = 0
+        for name in names.iterator():
+            if not source.exists(name):
+                if not target.exists(name):
+                    missing += 1
+                    self.stderr.write(f'Файл не найден: {name}')
+                continue
+            if options['dry_run']:
+                copied += 1
+                continue
+            with source.open(name) as content:
+                new_name = target.save(name, content)
+            if new_name != name:
+                recipes = Recipe.all_objects.filter(image=name)
+                recipe_ids = list(recipes.values_list('id', flat=True))
+                recipes.update(image=new_name, updated_at=timezone.now())
+                # .update() skips the signals that keep snapshots fresh.
+                rebuild_snapshots(recipe_ids)
+            copied += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {copied}, не найдено: {missing}'
+        ))
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.partitioning import (get_partitions, partitioned_models,
+                              supports_partitioning)
+
+PARTITION_STATS_SQL = '''
+    SELECT relname, n_live_tup, n_dead_tup,
+           GREATEST(last_vacuum, last_autovacuum),
+           pg_table_size(relid), pg_indexes_size(relid)
+    FROM pg_stat_user_tables
+    WHERE relname = ANY(%s)
+    ORDER BY relname
+'''
+
+
+class Command(BaseCommand):
+    help = ('Показывает состояние секций таблиц избранного, подписок и '
+            'покупок и обслуживает их по отдельности')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', action='append',
+                            help='Обслуживать только эту таблицу')
+        parser.add_argument('--vacuum', action='store_true',
+                            help='VACUUM ANALYZE секций с мёртвыми строками')
+        parser.add_argument('--dead-ratio', type=float, default=0.1,
+                            help='Доля мёртвых строк для --vacuum')
+        parser.add_argument('--all', action='store_true',
+                            help='Обслуживать все секции без порога')
+        parser.add_argument('--reindex', action='store_true',
+                            help='Перестроить индексы секций')
+
+    def handle(self, *args, **options):
+        if not supports_partitioning(connection):
+            raise CommandError('Секционирование доступно в PostgreSQL 11+.')
+        tables = [model._meta.db_table for model in partitioned_models()]
+        if options['table']:
+            unknown = set(options['table']) - set(tables)
+            if unknown:
+                raise CommandError(
+                    'Таблица не секционирована: ' + ', '.join(sorted(unknown))
+                )
+            tables = options['table']
+        quote = connection.ops.quote_name
+        for table in tables:
+            with connection.cursor() as cursor:
+                partitions = get_partitions(table, cursor)
+                if not partitions:
+                    self.stderr.write(f'{table}: нет секций, пропущено')
+                    continue
+                cursor.execute(PARTITION_STATS_SQL, [partitions])
+                stats = cursor.fetchall()
+            self.stdout.write(
+                f'{"секция":<20} {"строк":>10} {"мёртвых":>9} {"доля":>6} '
+                f'{"таблица, КБ":>12} {"индексы, КБ":>12}  последний vacuum'
+            )
+            for (name, live, dead, vacuumed,
+                 table_size, index_size) in stats:
+                ratio = dead / (live + dead) if live + dead else 0
+                self.stdout.write(
+                    f'{name:<20} {live:>10} {dead:>9} {ratio:>6.2f} '
+                    f'{table_size // 1024:>12} {index_size // 1024:>12}  '
+                    f'{vacuumed or "-"}'
+                )
+                # One partition at a time keeps locks and I/O bounded by the
+                # partition size instead of the whole table.
+                if options['vacuum'] and (
+                        options['all'] or ratio >= options['dead_ratio']):
+                    self.run(f'VACUUM (ANALYZE) {quote(name)}')
+                if options['reindex']:
+                    concurrently = (' CONCURRENTLY'
+                                    if connection.pg_version >= 120000
+                                    else '')
+                    self.run(f'REINDEX TABLE{concurrently} {quote(name)}')
+
+    def run(self, sql):
+        # VACUUM and REINDEX CONCURRENTLY refuse to run inside a transaction.
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+        self.stdout.write(f'  {sql}')
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import IngredientIndex, Recipe, RecipeSignature
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает индекс рецептов по ингредиентам '
+            'и сигнатуры для поиска похожих рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        index = defaultdict(set)
+        ingredients = defaultdict(set)
+        rows = Recipe.ingredients.through.objects.values_list(
+            'recipe_id', 'ingredientinrecipe__ingredient_id'
+        ).order_by().iterator(chunk_size=chunk_size)
+        for recipe_id, ingredient_id in rows:
+            index[ingredient_id].add(recipe_id)
+            ingredients[recipe_id].add(ingredient_id)
+
+        with transaction.atomic():
+            IngredientIndex.objects.all().delete()
+            IngredientIndex.objects.bulk_create(
+                (
+                    IngredientIndex(
+                        ingredient_id=ingredient_id,
+                        recipes_count=len(recipes),
+                    )
+                    for ingredient_id, recipes in index.items()
+                ),
+                batch_size=1000,
+            )
+            recipes = list(Recipe.objects.only('id', 'ingredients_count'))
+            for recipe in recipes:
+                recipe.ingredients_count = len(ingredients[recipe.id])
+            Recipe.objects.bulk_update(
+                recipes, ('ingredients_count',), batch_size=chunk_size
+            )
+        for recipe in recipes:
+            RecipeSignature.objects.update_recipe(
+                recipe.id, ingredients[recipe.id]
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано ингредиентов: {len(index)}, '
+            f'рецептов: {len(recipes)}'
+        ))
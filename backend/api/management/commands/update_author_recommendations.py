@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.recommendations import (NEIGHBOURS_PER_AUTHOR,
+                                 RECOMMENDATIONS_PER_USER,
+                                 update_recommendations)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации авторов по общим подпискам '
+            'и избранному')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int,
+                            default=RECOMMENDATIONS_PER_USER,
+                            help='Рекомендаций на пользователя')
+        parser.add_argument('--neighbours', type=int,
+                            default=NEIGHBOURS_PER_AUTHOR,
+                            help='Похожих авторов на автора')
+        parser.add_argument('--passes', type=int, default=1,
+                            help='Проходов по связям: больше проходов — '
+                                 'меньше памяти')
+
+    def handle(self, *args, **options):
+        authors, users = update_recommendations(
+            options['passes'], options['limit'], options['neighbours']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов с похожими: {authors}, '
+            f'пользователей с рекомендациями: {users}'
+        ))
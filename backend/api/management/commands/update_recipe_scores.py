@@ -0,0 +1,68 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import Favorite, Purchase, Recipe, RecipeScore
+
+PURCHASE_WEIGHT = 2
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинги популярных и набирающих популярность '
+            'рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--half-life-days', type=float, default=7)
+        parser.add_argument('--window-days', type=int, default=60)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        half_life = options['half_life_days']
+        today = timezone.localdate()
+        since = timezone.now() - timedelta(days=options['window_days'])
+        popular = defaultdict(float)
+        trending = defaultdict(float)
+
+        for model, weight in ((Favorite, 1), (Purchase, PURCHASE_WEIGHT)):
+            totals = model.objects.order_by().values('recipe').annotate(
+                count=Count('id')
+            ).values_list('recipe', 'count')
+            for recipe_id, count in totals:
+                popular[recipe_id] += weight * count
+
+            daily = model.objects.filter(date_added__gte=since).annotate(
+                day=TruncDate('date_added')
+            ).order_by().values('recipe', 'day').annotate(
+                count=Count('id')
+            ).values_list('recipe', 'day', 'count')
+            for recipe_id, day, count in daily:
+                age = (today - day).days
+                trending[recipe_id] += weight * count * 0.5 ** (
+                    age / half_life
+                )
+
+        with transaction.atomic():
+            # Recipes without favorites or purchases still get a zero row.
+            recipe_ids = list(Recipe.all_objects.values_list(
+                'id', flat=True
+            ))
+            RecipeScore.objects.all().delete()
+            RecipeScore.objects.bulk_create(
+                (
+                    RecipeScore(
+                        recipe_id=recipe_id,
+                        popular=popular.get(recipe_id, 0),
+                        trending=trending.get(recipe_id, 0),
+                    )
+                    for recipe_id in recipe_ids
+                ),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны рейтинги рецептов: {len(recipe_ids)}'
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_auto_20220326_1119'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientIndex',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='index', serialize=False, to='api.Ingredient', verbose_name='Ингредиент')),
+                ('recipes', models.BinaryField(default=bytes, verbose_name='Рецепты')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Количество рецептов')),
+            ],
+            options={
+                'verbose_name': 'Индекс ингредиента',
+                'verbose_name_plural': 'Индекс ингредиентов',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество разных ингредиентов'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipesignature',
+            name='ingredients',
+            field=models.BinaryField(default=bytes, verbose_name='Проиндексированные ингредиенты'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_recipe_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='snapshot',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Снимок для списков'),
+        ),
+    ]
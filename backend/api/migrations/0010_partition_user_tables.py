@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from api.partitioning import partition_tables
+
+# Historical models do not carry partition_by, so the tables are listed
+# here. Existing rows are copied into the partitioned table in place; on a
+# large table run it in a maintenance window, the copy holds an exclusive
+# lock.
+forwards, backwards = partition_tables([
+    ('api_favorite', 'user_id'),
+    ('api_follow', 'user_id'),
+    ('api_purchase', 'user_id'),
+])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_recipe_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0010_partition_user_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorRecommendation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_to', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рекомендованный автор',
+                'verbose_name_plural': 'Рекомендованные авторы',
+                'ordering': ('user', 'rank'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='authorrecommendation',
+            constraint=models.UniqueConstraint(fields=('user', 'rank'), name='author_recommendation_unique'),
+        ),
+    ]
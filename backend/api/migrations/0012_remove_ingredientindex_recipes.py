@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_author_recommendation'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ingredientindex',
+            name='recipes',
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+def backfill_scores(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    RecipeScore = apps.get_model('api', 'RecipeScore')
+    RecipeScore.objects.bulk_create(
+        (RecipeScore(recipe_id=recipe_id) for recipe_id in
+         Recipe.objects.filter(score__isnull=True).values_list(
+             'id', flat=True).iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_remove_ingredientindex_recipes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipescore',
+            name='popular',
+            field=models.FloatField(default=0, verbose_name='Популярность'),
+        ),
+        migrations.AlterField(
+            model_name='recipescore',
+            name='trending',
+            field=models.FloatField(default=0, verbose_name='Набирает популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['popular', 'recipe'], name='recipescore_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['trending', 'recipe'], name='recipescore_trending_idx'),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from django.http import StreamingHttpResponse
+
+from .renderers import FastJSONRenderer
+
+
+class StreamingListMixin:
+    stream_fields = None
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Pin the database now: the body is produced after the view returns.
+        queryset = queryset.using(queryset.db)
+        return StreamingHttpResponse(
+            self.stream(queryset.values(*self.stream_fields)),
+            content_type='application/json',
+        )
+
+    def stream(self, rows):
+        renderer = FastJSONRenderer()
+        separator = b'['
+        chunk = []
+        for row in rows.iterator(chunk_size=self.stream_chunk_size):
+            chunk.append(row)
+            if len(chunk) == self.stream_chunk_size:
+                yield separator + renderer.render(chunk)[1:-1]
+                separator = b','
+                chunk = []
+        if chunk:
+            yield separator + renderer.render(chunk)[1:-1]
+            separator = b','
+        yield b']' if separator == b',' else b'[]'
+
+
+class SoftDeleteAdminMixin:
+    soft_delete = None
+
+    def get_deleted_objects(self, objs, request):
+        # Skip the collector: dependants are purged later in the background.
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        self.soft_delete(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(queryset)
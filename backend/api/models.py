@@ -1,9 +1,25 @@
+import hashlib
+import operator
+import random
+from array import array
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, transaction
 
 User = get_user_model()
 
+MINHASH_PRIME = 4294967311
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_SIZE = MINHASH_BANDS * MINHASH_ROWS
+_minhash_random = random.Random(2022)
+MINHASH_COEFFICIENTS = [
+    (_minhash_random.randrange(1, MINHASH_PRIME),
+     _minhash_random.randrange(0, MINHASH_PRIME))
+    for _ in range(MINHASH_SIZE)
+]
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -20,10 +36,15 @@ class Tag(models.Model):
         unique=True
     )
     slug = models.SlugField(unique=True)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
 
     class Meta:
         verbose_name = 'тег'
         verbose_name_plural = 'теги'
+        indexes = [models.Index(fields=['updated_at', 'id'])]
 
     def __str__(self):
         return self.name
@@ -38,16 +59,29 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
         max_length=200,
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'ингредиент'
         verbose_name_plural = 'ингредиенты'
+        indexes = [models.Index(fields=['updated_at', 'id'])]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
 
 
+class RecipeManager(models.Manager):
+    def get_queryset(self):
+        # The snapshot is only read where recipes are rendered from it.
+        return super().get_queryset().filter(
+            deleted_at__isnull=True
+        ).defer('snapshot')
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -80,6 +114,11 @@ class Recipe(models.Model):
         verbose_name='Время приготовления',
         validators=[MinValueValidator(1, message='Не менее 1')],
     )
+    ingredients_count = models.PositiveIntegerField(
+        verbose_name='Количество разных ингредиентов',
+        default=0,
+        editable=False,
+    )
     is_favorited = models.BooleanField('В избранном', default=False)
     is_in_shopping_cart = models.BooleanField(
         'В списке покупок',
@@ -89,11 +128,31 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+    deleted_at = models.DateTimeField(
+        verbose_name='Дата удаления',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    snapshot = models.TextField(
+        verbose_name='Снимок для списков',
+        blank=True,
+        default='',
+        editable=False,
+    )
+
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [models.Index(fields=['updated_at', 'id'])]
 
     def __str__(self):
         return self.name
@@ -116,6 +175,9 @@ class IngredientInRecipe(models.Model):
 
 
 class Favorite(models.Model):
+    # Hash-partitioned by this column on PostgreSQL, see api.partitioning.
+    partition_by = 'user_id'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -145,6 +207,8 @@ class Favorite(models.Model):
 
 
 class Follow(models.Model):
+    partition_by = 'user_id'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -174,6 +238,8 @@ class Follow(models.Model):
 
 
 class Purchase(models.Model):
+    partition_by = 'user_id'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -201,3 +267,274 @@ class Purchase(models.Model):
 
     def __str__(self):
         return f'Рецепт {self.recipe} в списке покупок {self.user}'
+
+
+class AuthorRecommendation(models.Model):
+    # The unique (user, rank) index serves the lookup, a separate index on
+    # user would be redundant.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+        db_index=False,
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to',
+        verbose_name='Автор',
+    )
+    rank = models.PositiveSmallIntegerField(
+        verbose_name='Место',
+    )
+    score = models.FloatField(
+        verbose_name='Оценка',
+    )
+
+    class Meta:
+        ordering = ('user', 'rank')
+        verbose_name = 'Рекомендованный автор'
+        verbose_name_plural = 'Рекомендованные авторы'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'], name='author_recommendation_unique'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.author} для {self.user}'
+
+
+class IngredientIndexManager(models.Manager):
+    def counts_for(self, ingredient_ids):
+        return dict(self.filter(
+            ingredient_id__in=ingredient_ids, recipes_count__gt=0
+        ).values_list('ingredient_id', 'recipes_count'))
+
+    def reindex_recipe(self, recipe_id, old_ids, new_ids):
+        old_ids, new_ids = set(old_ids), set(new_ids)
+        added, removed = new_ids - old_ids, old_ids - new_ids
+        with transaction.atomic():
+            # Only the counts are kept: each change is a single-row
+            # UPDATE, so writers never rewrite or lock more than the
+            # counters they touch.
+            self.bulk_create(
+                [self.model(ingredient_id=ingredient_id)
+                 for ingredient_id in added],
+                ignore_conflicts=True,
+            )
+            if added:
+                self.filter(ingredient_id__in=added).update(
+                    recipes_count=models.F('recipes_count') + 1
+                )
+            if removed:
+                self.filter(
+                    ingredient_id__in=removed, recipes_count__gt=0
+                ).update(recipes_count=models.F('recipes_count') - 1)
+
+
+class IngredientIndex(models.Model):
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='index',
+        verbose_name='Ингредиент',
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+    )
+
+    objects = IngredientIndexManager()
+
+    class Meta:
+        verbose_name = 'Индекс ингредиента'
+        verbose_name_plural = 'Индекс ингредиентов'
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.recipes_count}'
+
+
+class RecipeScore(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт',
+    )
+    popular = models.FloatField(
+        verbose_name='Популярность',
+        default=0,
+    )
+    trending = models.FloatField(
+        verbose_name='Набирает популярность',
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата пересчета',
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = (
+            models.Index(fields=('popular', 'recipe'),
+                         name='recipescore_popular_idx'),
+            models.Index(fields=('trending', 'recipe'),
+                         name='recipescore_trending_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe}: {self.popular:.2f} / {self.trending:.2f}'
+
+
+class RecipeSignatureManager(models.Manager):
+    @staticmethod
+    def pack(values):
+        return array('I', sorted(values)).tobytes()
+
+    @staticmethod
+    def unpack(data):
+        values = array('I')
+        values.frombytes(bytes(data))
+        return values
+
+    @staticmethod
+    def minhash(ingredient_ids):
+        return array('I', (
+            min((a * ingredient_id + b) % MINHASH_PRIME
+                for ingredient_id in ingredient_ids) & 0xFFFFFFFF
+            for a, b in MINHASH_COEFFICIENTS
+        ))
+
+    @staticmethod
+    def bucket_keys(signature):
+        keys = []
+        for band in range(MINHASH_BANDS):
+            rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+            digest = hashlib.blake2b(
+                bytes([band]) + rows.tobytes(), digest_size=8
+            ).digest()
+            keys.append(int.from_bytes(digest, 'big', signed=True))
+        return keys
+
+    def indexed_ingredients(self, recipe_id):
+        data = self.filter(recipe_id=recipe_id).values_list(
+            'ingredients', flat=True
+        ).first()
+        return set(self.unpack(data or b''))
+
+    def update_recipe(self, recipe_id, ingredient_ids):
+        with transaction.atomic():
+            RecipeBucket.objects.filter(recipe_id=recipe_id).delete()
+            signature = (self.minhash(ingredient_ids) if ingredient_ids
+                         else array('I'))
+            self.update_or_create(
+                recipe_id=recipe_id,
+                defaults={
+                    'minhash': signature.tobytes(),
+                    'ingredients': self.pack(
+                        ingredient_ids
+                    ),
+                },
+            )
+            if not ingredient_ids:
+                return
+            RecipeBucket.objects.bulk_create(
+                RecipeBucket(key=key, recipe_id=recipe_id)
+                for key in self.bucket_keys(signature)
+            )
+
+    def similar_to(self, recipe_id, limit, max_candidates=1000):
+        data = self.filter(recipe_id=recipe_id).values_list(
+            'minhash', flat=True
+        ).first()
+        if not data:
+            return []
+        signature = self.unpack(data)
+        candidates = RecipeBucket.objects.filter(
+            key__in=self.bucket_keys(signature)
+        ).exclude(recipe_id=recipe_id).values('recipe_id').annotate(
+            bands=models.Count('id')
+        ).order_by('-bands').values_list('recipe_id', flat=True)
+        unpack = self.unpack
+        ranked = []
+        for candidate_id, candidate in self.filter(
+            recipe_id__in=list(candidates[:max_candidates])
+        ).values_list('recipe_id', 'minhash'):
+            matches = sum(map(operator.eq, signature, unpack(candidate)))
+            ranked.append((matches / MINHASH_SIZE, candidate_id))
+        ranked.sort(reverse=True)
+        return ranked[:limit]
+
+
+class RecipeSignature(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт',
+    )
+    minhash = models.BinaryField(
+        verbose_name='MinHash ингредиентов',
+    )
+    ingredients = models.BinaryField(
+        verbose_name='Проиндексированные ингредиенты',
+        default=bytes,
+    )
+
+    objects = RecipeSignatureManager()
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return str(self.recipe)
+
+
+class RecipeBucket(models.Model):
+    key = models.BigIntegerField(
+        verbose_name='Ключ корзины LSH',
+        db_index=True,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='buckets',
+        verbose_name='Рецепт',
+    )
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+
+    def __str__(self):
+        return f'{self.key}: {self.recipe}'
+
+
+class Tombstone(models.Model):
+    model = models.CharField(
+        verbose_name='Модель',
+        max_length=50,
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='ID объекта',
+    )
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата удаления',
+    )
+
+    class Meta:
+        verbose_name = 'Удаленный объект'
+        verbose_name_plural = 'Удаленные объекты'
+        indexes = [models.Index(fields=['deleted_at', 'id'])]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
@@ -0,0 +1,126 @@
+from django.db import connection
+
+# PostgreSQL declarative hash partitioning for the per-user tables. Django
+# 2.2 has no notion of partitioned tables, so the migration rebuilds the
+# table by hand and the models only declare the partition key.
+HASH_PARTITIONS = 16
+MIN_PG_VERSION = 110000
+
+TABLE_CONSTRAINTS_SQL = '''
+    SELECT conname, contype, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')
+    ORDER BY contype DESC, conname
+'''
+# Indexes that do not back a constraint: those are recreated with it.
+TABLE_INDEXES_SQL = '''
+    SELECT i.indexname, i.indexdef
+    FROM pg_indexes i
+    WHERE i.schemaname = current_schema() AND i.tablename = %s
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_constraint c
+          WHERE c.conname = i.indexname AND c.conrelid = %s::regclass
+      )
+    ORDER BY i.indexname
+'''
+PARTITIONS_SQL = '''
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = %s
+    ORDER BY child.relname
+'''
+
+
+def supports_partitioning(connection):
+    return (connection.vendor == 'postgresql'
+            and connection.pg_version >= MIN_PG_VERSION)
+
+
+def partitioned_models():
+    from django.apps import apps
+
+    return [model for model in apps.get_models()
+            if getattr(model, 'partition_by', None)]
+
+
+def get_partitions(table, cursor=None):
+    cursor = cursor or connection.cursor()
+    cursor.execute(PARTITIONS_SQL, [table])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def rebuild_table(cursor, table, partition_key=None,
+                  partitions=HASH_PARTITIONS):
+    quote = cursor.db.ops.quote_name
+    new_table = f'{table}_rebuild'
+    cursor.execute(TABLE_CONSTRAINTS_SQL, [table])
+    constraints = cursor.fetchall()
+    cursor.execute(TABLE_INDEXES_SQL, [table, table])
+    indexes = cursor.fetchall()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    sequence = cursor.fetchone()[0]
+
+    partition_clause = (f' PARTITION BY HASH ({quote(partition_key)})'
+                        if partition_key else '')
+    cursor.execute(
+        f'CREATE TABLE {quote(new_table)} (LIKE {quote(table)} '
+        f'INCLUDING DEFAULTS INCLUDING STORAGE){partition_clause}'
+    )
+    if partition_key:
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE {quote(f"{table}_p{remainder}")} '
+                f'PARTITION OF {quote(new_table)} FOR VALUES WITH '
+                f'(MODULUS {partitions}, REMAINDER {remainder})'
+            )
+    # Constraints and indexes are added after the copy: loading into a
+    # bare table and indexing once is much cheaper than row-by-row upkeep.
+    cursor.execute(
+        f'INSERT INTO {quote(new_table)} SELECT * FROM {quote(table)}'
+    )
+    if sequence:
+        cursor.execute(
+            f'ALTER SEQUENCE {sequence} OWNED BY {quote(new_table)}.id'
+        )
+    cursor.execute(f'DROP TABLE {quote(table)}')
+    cursor.execute(
+        f'ALTER TABLE {quote(new_table)} RENAME TO {quote(table)}'
+    )
+    for name, kind, definition in constraints:
+        if kind == 'p':
+            # Unique keys of a partitioned table must contain the
+            # partition key; id stays unique through its sequence.
+            columns = f'id, {quote(partition_key)}' if partition_key else 'id'
+            definition = f'PRIMARY KEY ({columns})'
+        elif (kind == 'u' and partition_key
+              and partition_key not in definition):
+            raise ValueError(
+                f'{name}: уникальное ограничение без ключа секционирования'
+            )
+        cursor.execute(
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+            f'{definition}'
+        )
+    for name, definition in indexes:
+        cursor.execute(definition)
+    cursor.execute(f'ANALYZE {quote(table)}')
+
+
+def partition_tables(tables, partitions=HASH_PARTITIONS):
+    def forwards(apps, schema_editor):
+        if not supports_partitioning(schema_editor.connection):
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for table, key in tables:
+                rebuild_table(cursor, table, key, partitions)
+
+    def backwards(apps, schema_editor):
+        if not supports_partitioning(schema_editor.connection):
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for table, key in tables:
+                rebuild_table(cursor, table)
+
+    return forwards, backwards
@@ -0,0 +1,173 @@
+import heapq
+import math
+from array import array
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import AuthorRecommendation, Favorite, Follow
+
+WEIGHTS = {'follow': 1.0, 'favorite': 0.5}
+RECOMMENDATIONS_PER_USER = 20
+NEIGHBOURS_PER_AUTHOR = 50
+# Co-occurrence work grows with the square of a row: accounts following
+# thousands of authors add little signal and most of the cost.
+MAX_ROW_LENGTH = 1000
+# Candidate lists are cut back to PRUNE_KEEP x limit entries whenever they
+# grow past PRUNE_AT x limit.
+PRUNE_AT = 4
+PRUNE_KEEP = 2
+EDGE_CHUNK_SIZE = 10000
+WRITE_BATCH_SIZE = 5000
+
+
+def follow_edges():
+    return Follow.objects.filter(
+        user__deleted_at__isnull=True, author__deleted_at__isnull=True
+    ).order_by('user_id', 'author_id').values_list(
+        'user_id', 'author_id'
+    ).iterator(chunk_size=EDGE_CHUNK_SIZE)
+
+
+def favorite_edges():
+    return Favorite.objects.filter(
+        user__deleted_at__isnull=True,
+        recipe__deleted_at__isnull=True,
+        recipe__author__deleted_at__isnull=True,
+    ).order_by('user_id', 'recipe__author_id').values_list(
+        'user_id', 'recipe__author_id'
+    ).distinct().iterator(chunk_size=EDGE_CHUNK_SIZE)
+
+
+def iter_rows():
+    # Rows of the sparse user x author matrix, streamed one user at a time
+    # from two cursors sorted by user: memory is bounded by a single row.
+    edges = heapq.merge(
+        ((user_id, author_id, 'follow')
+         for user_id, author_id in follow_edges()),
+        ((user_id, author_id, 'favorite')
+         for user_id, author_id in favorite_edges()),
+    )
+    for user_id, group in groupby(edges, key=itemgetter(0)):
+        row = defaultdict(float)
+        followed = set()
+        for _, author_id, kind in group:
+            row[author_id] += WEIGHTS[kind]
+            if kind == 'follow':
+                followed.add(author_id)
+        yield user_id, row, followed
+
+
+def author_norms():
+    norms = defaultdict(float)
+    for user_id, row, followed in iter_rows():
+        if len(row) > MAX_ROW_LENGTH:
+            continue
+        for author_id, weight in row.items():
+            norms[author_id] += weight * weight
+    return {author_id: math.sqrt(norm) for author_id, norm in norms.items()}
+
+
+def prune(candidates, norms, keep):
+    # The author's own norm is the same for every candidate, so ranking by
+    # dot / norm of the candidate is ranking by partial cosine.
+    return defaultdict(float, heapq.nlargest(
+        keep, candidates.items(),
+        key=lambda item: item[1] / norms[item[0]],
+    ))
+
+
+def author_neighbours(passes=1, limit=NEIGHBOURS_PER_AUTHOR):
+    # Cosine similarity of author columns, i.e. the product M^T M. Each
+    # pass accumulates the rows of one hash slice of authors. Candidate
+    # lists are pruned as they grow, so memory is bounded by slice size x
+    # (PRUNE_AT x limit + MAX_ROW_LENGTH). Pruning is approximate: a pair
+    # cut early on a low partial score may be missed.
+    norms = author_norms()
+    neighbours = {}
+    for part in range(passes):
+        dots = defaultdict(lambda: defaultdict(float))
+        for user_id, row, followed in iter_rows():
+            if len(row) > MAX_ROW_LENGTH:
+                continue
+            # Edges added since the norms were taken wait for the next run.
+            items = [(author_id, weight) for author_id, weight in row.items()
+                     if author_id in norms]
+            for author_id, weight in items:
+                if author_id % passes != part:
+                    continue
+                target = dots[author_id]
+                for other_id, other_weight in items:
+                    if other_id != author_id:
+                        target[other_id] += weight * other_weight
+                if len(target) > PRUNE_AT * limit:
+                    dots[author_id] = prune(target, norms, PRUNE_KEEP * limit)
+        for author_id in list(dots):
+            norm = norms[author_id]
+            top = heapq.nlargest(limit, (
+                (other_id, dot / (norm * norms[other_id]))
+                for other_id, dot in dots.pop(author_id).items()
+            ), key=itemgetter(1))
+            # Packed arrays take a fraction of the memory of tuples.
+            neighbours[author_id] = (
+                array('l', map(itemgetter(0), top)),
+                array('f', map(itemgetter(1), top)),
+            )
+    return neighbours
+
+
+def recommend(neighbours, limit=RECOMMENDATIONS_PER_USER):
+    # Scores are the product M x S, one user row at a time.
+    for user_id, row, followed in iter_rows():
+        scores = defaultdict(float)
+        for author_id, weight in row.items():
+            if author_id not in neighbours:
+                continue
+            for other_id, similarity in zip(*neighbours[author_id]):
+                scores[other_id] += weight * similarity
+        for author_id in followed | {user_id}:
+            scores.pop(author_id, None)
+        if scores:
+            yield user_id, heapq.nlargest(
+                limit, scores.items(), key=itemgetter(1)
+            )
+
+
+def replace_users(after, upto, rows):
+    # Users with ids in (after, upto] are rewritten in one short
+    # transaction: readers see either the old or the new list of a user,
+    # and the table is never locked as a whole. Users in the range that
+    # got no recommendations lose their stale ones.
+    stale = AuthorRecommendation.objects.all()
+    if after is not None:
+        stale = stale.filter(user_id__gt=after)
+    if upto is not None:
+        stale = stale.filter(user_id__lte=upto)
+    with transaction.atomic():
+        stale.delete()
+        AuthorRecommendation.objects.bulk_create(rows)
+
+
+def update_recommendations(passes=1, limit=RECOMMENDATIONS_PER_USER,
+                           neighbours_limit=NEIGHBOURS_PER_AUTHOR):
+    neighbours = author_neighbours(passes, neighbours_limit)
+    users = 0
+    batch = []
+    # recommend() walks users in id order, so written users form a range.
+    done = None
+    for user_id, ranked in recommend(neighbours, limit):
+        users += 1
+        batch.extend(
+            AuthorRecommendation(
+                user_id=user_id, author_id=author_id,
+                rank=rank, score=score,
+            )
+            for rank, (author_id, score) in enumerate(ranked, 1)
+        )
+        if len(batch) >= WRITE_BATCH_SIZE:
+            replace_users(done, user_id, batch)
+            done, batch = user_id, []
+    replace_users(done, None, batch)
+    return len(neighbours), users
@@ -1,10 +1,44 @@
-from django.shortcuts import get_object_or_404
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from .models import (Favorite, Follow, Ingredient, IngredientInRecipe,
-                     Purchase, Recipe, Tag, User)
+from jobs.registry import enqueue
+
+from .batch import BATCH_MAX_REQUESTS
+from .fast_serializers import serialize_recipe_cards
+from .models import (AuthorRecommendation, Favorite, Follow, Ingredient,
+                     IngredientInRecipe, Purchase, Recipe, Tag, User)
+from .shopping import SHOPPING_PLAN_MAX_RECIPES, SHOPPING_PLAN_MAX_SERVINGS
+from .tasks import index_recipe
+
+
+def get_sparse_fields(request):
+    if request is None or 'fields' not in request.query_params:
+        return None, set()
+    fields = {
+        name.strip() for name in request.query_params['fields'].split(',')
+    }
+    expand = {
+        name.strip()
+        for name in request.query_params.get('expand', '').split(',')
+    }
+    return fields | expand, expand
+
+
+class SparseFieldsMixin:
+    compact_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = get_sparse_fields(self.context.get('request'))
+        if fields is None:
+            return
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+            elif name in self.compact_fields and name not in expand:
+                self.fields[name] = self.compact_fields[name]()
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -19,19 +53,30 @@ class UserSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(user=request.user, author=obj.id).exists()
 
 
+class UserListSerializer(SparseFieldsMixin, UserSerializer):
+    recipes_count = serializers.IntegerField(read_only=True)
+    followers_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('recipes_count',
+                                               'followers_count')
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = ('id', 'name', 'measurement_unit')
 
 
 class IngredientsAmountSerializer(serializers.ModelSerializer):
@@ -39,24 +84,25 @@ class IngredientsAmountSerializer(serializers.ModelSerializer):
         queryset=Ingredient.objects.all(),
         source='ingredient'
     )
-    name = serializers.SerializerMethodField(read_only=True)
-    measurement_unit = serializers.SerializerMethodField(read_only=True)
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
 
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
-    def _get_ingredient(self, ingredient_id):
-        return get_object_or_404(Ingredient, id=ingredient_id)
 
-    def get_name(self, amount):
-        return self._get_ingredient(amount.ingredient.id).name
+class CompactIngredientsAmountSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient_id')
 
-    def get_measurement_unit(self, amount):
-        return self._get_ingredient(amount.ingredient.id).measurement_unit
+    class Meta:
+        model = IngredientInRecipe
+        fields = ('id', 'amount')
 
 
-class ListRecipeSerializer(serializers.ModelSerializer):
+class ListRecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     image = Base64ImageField(max_length=None, use_url=True)
     tags = TagSerializer(read_only=True, many=True)
     author = UserSerializer(read_only=True)
@@ -74,9 +120,21 @@ class ListRecipeSerializer(serializers.ModelSerializer):
                   'cooking_time')
         read_only_fields = ('author', 'tags',)
 
+    compact_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            read_only=True, many=True
+        ),
+        'ingredients': lambda: CompactIngredientsAmountSerializer(
+            many=True, read_only=True
+        ),
+    }
+
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request.user.is_authenticated:
+            if hasattr(obj, 'is_favorited_by_user'):
+                return obj.is_favorited_by_user
             return Favorite.objects.filter(user=request.user,
                                            recipe=obj).exists()
         return False
@@ -84,6 +142,8 @@ class ListRecipeSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if request.user.is_authenticated:
+            if hasattr(obj, 'is_in_user_shopping_cart'):
+                return obj.is_in_user_shopping_cart
             return Purchase.objects.filter(user=request.user,
                                            recipe=obj).exists()
         return False
@@ -120,19 +180,25 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
                   'is_in_shopping_cart', 'name', 'image', 'text',
                   'cooking_time')
 
-    def create(self, validated_data):
-        tags = validated_data.pop('tags')
-        image = validated_data.pop('image')
-        ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(image=image, **validated_data)
+    def _set_ingredients(self, recipe, ingredients):
         ingredients_list = []
         for ingredient in ingredients:
             ingredient_amount, status = IngredientInRecipe.objects.get_or_create(**ingredient)
             ingredients_list.append(ingredient_amount)
         recipe.ingredients.set(ingredients_list)
+        enqueue(index_recipe, recipe_id=recipe.id)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        tags = validated_data.pop('tags')
+        image = validated_data.pop('image')
+        ingredients = validated_data.pop('ingredients')
+        recipe = Recipe.objects.create(image=image, **validated_data)
+        self._set_ingredients(recipe, ingredients)
         recipe.tags.set(tags)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -144,11 +210,7 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
             instance.cooking_time
         )
         instance.save()
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_amount, status = IngredientInRecipe.objects.get_or_create(**ingredient)
-            ingredients_list.append(ingredient_amount)
-        instance.ingredients.set(ingredients_list)
+        self._set_ingredients(instance, ingredients)
         instance.tags.set(tags)
         return instance
 
@@ -175,22 +237,44 @@ class ShowFollowerSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(
-            user=obj.user, author=obj.author
-        ).exists()
+        # Each row is a Follow of the requesting user.
+        return True
 
     def get_recipes(self, obj):
+        cards = self.context.get('recipes')
+        if cards is not None:
+            return cards[obj.author_id]
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         queryset = Recipe.objects.filter(author=obj.author)
         if limit:
             queryset = queryset[:int(limit)]
-        return FollowerRecipeSerializer(queryset, many=True).data
+        return serialize_recipe_cards(queryset)
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj.author).count()
 
 
+class RecommendedAuthorSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='author.id')
+    email = serializers.ReadOnlyField(source='author.email')
+    username = serializers.ReadOnlyField(source='author.username')
+    first_name = serializers.ReadOnlyField(source='author.first_name')
+    last_name = serializers.ReadOnlyField(source='author.last_name')
+    # Authors the user already follows are excluded when serving.
+    is_subscribed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuthorRecommendation
+        fields = ('email', 'id', 'username', 'first_name', 'last_name',
+                  'is_subscribed')
+
+    def get_is_subscribed(self, obj):
+        return False
+
+
 class FavoritesSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
@@ -236,3 +320,53 @@ class PurchaseSerializer(FavoritesSerializer):
         return FollowerRecipeSerializer(
             instance.recipe,
             context=context).data
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        choices=('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+    )
+    path = serializers.RegexField(r'^/api/')
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, requests):
+        if len(requests) > BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'Не более {BATCH_MAX_REQUESTS} запросов в пакете.'
+            )
+        return requests
+
+
+class ShoppingPlanItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    servings = serializers.FloatField(
+        default=1, min_value=0.01, max_value=SHOPPING_PLAN_MAX_SERVINGS
+    )
+
+
+class ShoppingListPreviewSerializer(serializers.Serializer):
+    recipes = ShoppingPlanItemSerializer(many=True, allow_empty=False)
+
+    def validate_recipes(self, recipes):
+        if len(recipes) > SHOPPING_PLAN_MAX_RECIPES:
+            raise serializers.ValidationError(
+                f'Не более {SHOPPING_PLAN_MAX_RECIPES} рецептов в плане.'
+            )
+        servings = {}
+        for item in recipes:
+            servings[item['id']] = (
+                servings.get(item['id'], 0) + item['servings']
+            )
+        missing = set(servings) - set(Recipe.objects.filter(
+            id__in=servings
+        ).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                'Рецепты не найдены: '
+                + ', '.join(map(str, sorted(missing)))
+            )
+        return servings
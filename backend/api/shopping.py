@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.db.models import (Case, ExpressionWrapper, F, FloatField, Sum,
+                              Value, When)
+
+from .models import Recipe
+
+# Metric units are folded into one base unit so that "г" and "кг" rows of
+# the same product end up in a single line. Household measures (spoons,
+# cups, pieces) have no reliable conversion and are kept as they are.
+UNITS = {
+    'мг': ('г', 0.001),
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+
+SHOPPING_PLAN_MAX_RECIPES = 500
+SHOPPING_PLAN_MAX_SERVINGS = 100
+
+Through = Recipe.ingredients.through
+
+
+def normalize_unit(unit):
+    unit = ' '.join(unit.split()).lower()
+    return UNITS.get(unit.rstrip('.'), (unit, 1))
+
+
+def format_amount(amount):
+    amount = round(amount, 3)
+    return int(amount) if amount == int(amount) else amount
+
+
+def aggregate_rows(rows):
+    totals = {}
+    for name, unit, amount in rows:
+        unit, factor = normalize_unit(unit)
+        key = (name.strip().lower(), unit)
+        if key not in totals:
+            totals[key] = [name.strip(), unit, 0]
+        totals[key][2] += (amount or 0) * factor
+    return [
+        {'name': name, 'measurement_unit': unit,
+         'amount': format_amount(amount)}
+        for name, unit, amount in sorted(
+            totals.values(), key=lambda item: (item[0].lower(), item[1])
+        )
+    ]
+
+
+def ingredient_totals(queryset, amount):
+    return aggregate_rows(queryset.values_list(
+        'ingredientinrecipe__ingredient__name',
+        'ingredientinrecipe__ingredient__measurement_unit',
+    ).annotate(amount=Sum(amount)).order_by(
+        'ingredientinrecipe__ingredient__name',
+        'ingredientinrecipe__ingredient__measurement_unit',
+    ))
+
+
+def cart_shopping_list(user):
+    return ingredient_totals(
+        Through.objects.filter(
+            recipe__purchases__user=user,
+            recipe__deleted_at__isnull=True,
+        ),
+        F('ingredientinrecipe__amount'),
+    )
+
+
+def plan_shopping_list(servings):
+    # One grouped query with the multiplier applied in SQL. Recipes are
+    # bucketed by multiplier, so a plan of hundreds of recipes compiles to
+    # a CASE with a handful of branches rather than one per recipe.
+    buckets = defaultdict(list)
+    for recipe_id, factor in servings.items():
+        if factor != 1:
+            buckets[float(factor)].append(recipe_id)
+    multiplier = Case(
+        *[When(recipe_id__in=recipe_ids, then=Value(factor))
+          for factor, recipe_ids in buckets.items()],
+        default=Value(1.0),
+        output_field=FloatField(),
+    )
+    return ingredient_totals(
+        Through.objects.filter(
+            recipe_id__in=servings, recipe__deleted_at__isnull=True
+        ),
+        ExpressionWrapper(
+            F('ingredientinrecipe__amount') * multiplier,
+            output_field=FloatField(),
+        ),
+    )
@@ -0,0 +1,106 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from foodgram.middleware import stick_to_primary
+from jobs.registry import enqueue
+
+from .models import (Ingredient, IngredientIndex, Recipe, RecipeScore,
+                     RecipeSignature, Tag, Tombstone, User)
+from .snapshots import schedule_snapshots
+from .tasks import rebuild_recipe_snapshots, touch_recipes
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_index(sender, instance, **kwargs):
+    # The counts only include what index_recipe has already indexed.
+    IngredientIndex.objects.reindex_recipe(
+        instance.id,
+        RecipeSignature.objects.indexed_ingredients(instance.id),
+        (),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def create_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=sender._meta.model_name, object_id=instance.pk
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(sender, instance, created, **kwargs):
+    # Every recipe has a score row, so ordering by score is an inner join.
+    if created:
+        RecipeScore.objects.bulk_create(
+            [RecipeScore(recipe_id=instance.id)], ignore_conflicts=True
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def rebuild_recipe_snapshot(sender, instance, raw, **kwargs):
+    if not raw:
+        schedule_snapshots([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def rebuild_snapshots_on_m2m(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_snapshots([instance.id])
+    elif pk_set:
+        schedule_snapshots(pk_set)
+
+
+def rebuild_snapshots_later(recipes):
+    # The M2M rows are gone once the delete commits, so collect ids now.
+    recipe_ids = list(recipes.values_list('id', flat=True).distinct())
+    if recipe_ids:
+        transaction.on_commit(lambda: enqueue(
+            rebuild_recipe_snapshots, recipe_ids=recipe_ids
+        ))
+
+
+@receiver(pre_delete, sender=Tag)
+def rebuild_tag_recipe_snapshots(sender, instance, **kwargs):
+    rebuild_snapshots_later(instance.recipes.all())
+
+
+@receiver(pre_delete, sender=Ingredient)
+def rebuild_ingredient_recipe_snapshots(sender, instance, **kwargs):
+    rebuild_snapshots_later(
+        Recipe.objects.filter(ingredients__ingredient=instance)
+    )
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(sender, instance, created, **kwargs):
+    if not created:
+        enqueue(touch_recipes, tags=instance.id)
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        enqueue(touch_recipes, ingredients__ingredient=instance.id)
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    enqueue(touch_recipes, author=instance.id)
+
+
+@receiver(user_logged_in)
+def keep_new_token_on_primary(sender, request, user, **kwargs):
+    # The next requests carry the new token, which a lagging replica would
+    # not know yet.
+    stick_to_primary(request, f'Token {user.auth_token.key}')
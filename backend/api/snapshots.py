@@ -0,0 +1,138 @@
+import json
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Recipe, User
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SNAPSHOT_BATCH_SIZE = 500
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+
+_pending = threading.local()
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def build_snapshots(recipe_ids):
+    recipes = {
+        recipe['id']: recipe
+        for recipe in Recipe.objects.filter(id__in=recipe_ids).values(
+            'id', 'author_id', 'name', 'image', 'text', 'cooking_time'
+        )
+    }
+    if not recipes:
+        return {}
+    tags = defaultdict(list)
+    for recipe_id, *tag in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipes).order_by('tag_id').values_list(
+            'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'):
+        tags[recipe_id].append(dict(zip(TAG_FIELDS, tag)))
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, name, unit, amount in (
+            Recipe.ingredients.through.objects.filter(
+                recipe_id__in=recipes
+            ).order_by('ingredientinrecipe_id').values_list(
+                'recipe_id',
+                'ingredientinrecipe__ingredient_id',
+                'ingredientinrecipe__ingredient__name',
+                'ingredientinrecipe__ingredient__measurement_unit',
+                'ingredientinrecipe__amount')):
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    authors = {
+        author['id']: author
+        for author in User.all_objects.filter(
+            id__in={recipe['author_id'] for recipe in recipes.values()}
+        ).values(*USER_FIELDS)
+    }
+    return {
+        recipe_id: {
+            'id': recipe_id,
+            'tags': tags[recipe_id],
+            'author': authors[recipe['author_id']],
+            'ingredients': ingredients[recipe_id],
+            'name': recipe['name'],
+            'image': recipe['image'],
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+        }
+        for recipe_id, recipe in recipes.items()
+    }
+
+
+def load_snapshots(rows):
+    rows = list(rows)
+    snapshots = {
+        recipe_id: loads(snapshot)
+        for recipe_id, snapshot in rows if snapshot
+    }
+    missing = [recipe_id for recipe_id, snapshot in rows if not snapshot]
+    if missing:
+        # Not rebuilt yet: render on the fly, the write path will catch up.
+        snapshots.update(build_snapshots(missing))
+    return [
+        snapshots[recipe_id] for recipe_id, snapshot in rows
+        if recipe_id in snapshots
+    ]
+
+
+def get_snapshots(recipe_ids):
+    rows = dict(Recipe.objects.filter(id__in=recipe_ids).values_list(
+        'id', 'snapshot'
+    ))
+    return load_snapshots(
+        (recipe_id, rows[recipe_id]) for recipe_id in recipe_ids
+        if recipe_id in rows
+    )
+
+
+def rebuild_snapshots(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), SNAPSHOT_BATCH_SIZE):
+        snapshots = build_snapshots(
+            recipe_ids[start:start + SNAPSHOT_BATCH_SIZE]
+        )
+        Recipe.all_objects.bulk_update(
+            [Recipe(id=recipe_id, snapshot=dumps(snapshot))
+             for recipe_id, snapshot in snapshots.items()],
+            ['snapshot'],
+        )
+
+
+def flush_snapshots():
+    recipe_ids = getattr(_pending, 'recipe_ids', set())
+    _pending.recipe_ids = set()
+    if recipe_ids:
+        rebuild_snapshots(sorted(recipe_ids))
+
+
+def schedule_snapshots(recipe_ids):
+    # Every call queues a flush, since a rolled back registration cannot be
+    # seen through the public API; ids collect in a per-thread set, so the
+    # first flush after a commit rebuilds them all and the rest are no-ops.
+    # Ids left behind by a rollback are rebuilt, harmlessly, by the next one.
+    if not hasattr(_pending, 'recipe_ids'):
+        _pending.recipe_ids = set()
+    _pending.recipe_ids.update(recipe_ids)
+    transaction.on_commit(flush_snapshots)
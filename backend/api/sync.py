@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .fast_serializers import FastRecipeListSerializer
+from .models import Ingredient, Recipe, Tag, Tombstone
+from .snapshots import TAG_FIELDS
+
+SYNC_LAG = timedelta(seconds=2)
+STREAMS = ('tags', 'ingredients', 'recipes', 'deleted')
+
+
+def encode_token(cursors):
+    data = json.dumps(cursors, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_token(token):
+    if not token:
+        return {}
+    try:
+        cursors = json.loads(base64.urlsafe_b64decode(token.encode()))
+        decoded = {
+            stream: (parse_datetime(cursors[stream][0]),
+                     int(cursors[stream][1]))
+            for stream in STREAMS if stream in cursors
+        }
+    except (binascii.Error, ValueError, TypeError, KeyError, IndexError):
+        decoded = None
+    # parse_datetime returns None for a string that is not a timestamp.
+    if decoded is None or any(
+            timestamp is None for timestamp, pk in decoded.values()):
+        raise ValidationError({'since': 'Некорректный токен синхронизации.'})
+    return decoded
+
+
+def after(queryset, field, cursor, until):
+    queryset = queryset.filter(**{f'{field}__lt': until})
+    if cursor is not None:
+        timestamp, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{field}__gt': timestamp})
+            | Q(**{field: timestamp, 'id__gt': pk})
+        )
+    return queryset.order_by(field, 'id')
+
+
+class DeltaSync:
+    def __init__(self, request, limit):
+        self.request = request
+        self.limit = limit
+        self.until = timezone.now() - SYNC_LAG
+
+    def page(self, queryset, field, cursor, columns):
+        rows = list(after(queryset, field, cursor, self.until).values(
+            field, *columns
+        )[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if rows:
+            cursor = (rows[-1][field], rows[-1]['id'])
+        return rows, cursor, has_more
+
+    def run(self, token):
+        cursors = decode_token(token)
+        data = {}
+        has_more = False
+
+        tags, cursors['tags'], more = self.page(
+            Tag.objects.all(), 'updated_at', cursors.get('tags'), TAG_FIELDS
+        )
+        data['tags'] = [{name: tag[name] for name in TAG_FIELDS}
+                        for tag in tags]
+        has_more |= more
+
+        ingredients, cursors['ingredients'], more = self.page(
+            Ingredient.objects.all(), 'updated_at',
+            cursors.get('ingredients'), ('id', 'name', 'measurement_unit')
+        )
+        data['ingredients'] = [
+            {'id': row['id'], 'name': row['name'],
+             'measurement_unit': row['measurement_unit']}
+            for row in ingredients
+        ]
+        has_more |= more
+
+        recipes, cursors['recipes'], more = self.page(
+            Recipe.objects.all(), 'updated_at', cursors.get('recipes'),
+            ('id',)
+        )
+        # Favorites, cart and follows do not touch updated_at, so flags of
+        # the requesting user would go stale in the client's copy.
+        data['recipes'] = FastRecipeListSerializer(
+            self.request, personal=False
+        ).serialize([row['id'] for row in recipes])
+        has_more |= more
+
+        deleted, cursors['deleted'], more = self.page(
+            Tombstone.objects.all(), 'deleted_at', cursors.get('deleted'),
+            ('id', 'model', 'object_id')
+        )
+        data['deleted'] = {
+            'tags': [row['object_id'] for row in deleted
+                     if row['model'] == 'tag'],
+            'ingredients': [row['object_id'] for row in deleted
+                            if row['model'] == 'ingredient'],
+            'recipes': [row['object_id'] for row in deleted
+                        if row['model'] == 'recipe'],
+        }
+        has_more |= more
+
+        data['next'] = encode_token({
+            stream: (cursor[0].isoformat(), cursor[1])
+            for stream, cursor in cursors.items() if cursor is not None
+        })
+        data['has_more'] = has_more
+        return data
@@ -0,0 +1,140 @@
+from django.db import models, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from jobs.registry import job
+
+from .models import IngredientIndex, Recipe, RecipeSignature, User
+from .snapshots import rebuild_snapshots
+
+PURGE_BATCH_SIZE = 1000
+
+
+@job(priority=10)
+def index_recipe(recipe_id):
+    with transaction.atomic():
+        if not Recipe.objects.select_for_update().filter(
+                id=recipe_id).exists():
+            return
+        new_ids = set(Recipe.ingredients.through.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredientinrecipe__ingredient_id', flat=True))
+        old_ids = RecipeSignature.objects.indexed_ingredients(recipe_id)
+        IngredientIndex.objects.reindex_recipe(recipe_id, old_ids, new_ids)
+        if old_ids != new_ids:
+            RecipeSignature.objects.update_recipe(recipe_id, new_ids)
+        Recipe.objects.filter(id=recipe_id).update(
+            ingredients_count=len(new_ids)
+        )
+
+
+@job()
+def touch_recipes(**filters):
+    recipes = Recipe.objects.filter(**filters)
+    recipes.update(updated_at=timezone.now())
+    rebuild_snapshots(recipes.values_list('id', flat=True).distinct())
+
+
+@job()
+def rebuild_recipe_snapshots(recipe_ids):
+    rebuild_snapshots(recipe_ids)
+
+
+def delete_in_batches(queryset):
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:PURGE_BATCH_SIZE])
+        if not ids:
+            return
+        delete_rows(queryset.model, ids)
+
+
+def apply_on_delete(relation, related):
+    # PROTECT, SET(...) and custom handlers: let the handler decide
+    # through a collector, then apply only the field updates it asked for.
+    collector = Collector(using=related.db)
+    relation.on_delete(collector, relation.field, list(related), related.db)
+    for (field, value), objs in collector.field_updates.get(
+            relation.related_model, {}).items():
+        relation.related_model._base_manager.filter(
+            pk__in=[obj.pk for obj in objs]
+        ).update(**{field.name: value})
+
+
+def delete_rows(model, ids):
+    # Same cascade as Model.delete(), but without loading related rows or
+    # sending signals: dependants are removed batch by batch by primary key.
+    for field in model._meta.local_many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            delete_in_batches(through._base_manager.filter(
+                **{f'{field.m2m_field_name()}__in': ids}
+            ))
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            if relation.through._meta.auto_created:
+                delete_in_batches(relation.through._base_manager.filter(
+                    **{f'{relation.field.m2m_reverse_field_name()}__in': ids}
+                ))
+            continue
+        related = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': ids}
+        )
+        if relation.on_delete is models.CASCADE:
+            delete_in_batches(related)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+        elif relation.on_delete is models.SET_DEFAULT:
+            related.update(
+                **{relation.field.name: relation.field.get_default()}
+            )
+        elif relation.on_delete is not models.DO_NOTHING:
+            apply_on_delete(relation, related)
+    queryset = model._base_manager.filter(pk__in=ids)
+    queryset._raw_delete(queryset.db)
+
+
+def purge_recipe_rows(recipe_ids):
+    for recipe_id in recipe_ids:
+        IngredientIndex.objects.reindex_recipe(
+            recipe_id,
+            RecipeSignature.objects.indexed_ingredients(recipe_id),
+            (),
+        )
+    delete_rows(Recipe, recipe_ids)
+
+
+def report_progress(job, done, total):
+    if job is not None:
+        job.set_progress(done, total)
+
+
+@job(bind=True)
+def purge_recipes(job, recipe_ids):
+    recipe_ids = list(Recipe.all_objects.filter(
+        id__in=recipe_ids, deleted_at__isnull=False
+    ).values_list('id', flat=True))
+    for start in range(0, len(recipe_ids), PURGE_BATCH_SIZE):
+        purge_recipe_rows(recipe_ids[start:start + PURGE_BATCH_SIZE])
+        report_progress(job, start + PURGE_BATCH_SIZE, len(recipe_ids))
+    report_progress(job, 1, 1)
+
+
+@job(bind=True)
+def purge_user(job, user_id):
+    if not User.all_objects.filter(
+            id=user_id, deleted_at__isnull=False).exists():
+        return
+    recipes = Recipe.all_objects.filter(author_id=user_id)
+    total = recipes.count() + 1
+    done = 0
+    while True:
+        recipe_ids = list(
+            recipes.values_list('id', flat=True)[:PURGE_BATCH_SIZE]
+        )
+        if not recipe_ids:
+            break
+        purge_recipe_rows(recipe_ids)
+        done += len(recipe_ids)
+        report_progress(job, done, total)
+    delete_rows(User, [user_id])
+    report_progress(job, total, total)
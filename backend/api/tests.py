@@ -0,0 +1,164 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+
+from .models import Ingredient, Tag
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PASSWORD = 'pass12345!'
+
+
+def image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2), 'red').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+# Every request below fails with QueryBudgetExceeded if its view goes over
+# the budget in its query_budgets; a regression shows up here first.
+@override_settings(
+    QUERY_BUDGET_MODE='raise',
+    JOBS_INLINE=False,
+    MEDIA_ROOT=MEDIA_ROOT,
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'autocomplete': '1000/s', 'export': '1000/s', 'writes': '1000/s',
+        },
+    },
+)
+class QueryBudgetTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(5)
+        ]
+        self.author, self.author_client = self.user('author')
+        self.reader, self.client = self.user('reader')
+        self.anonymous = APIClient()
+        self.recipe = self.create_recipe()
+
+    def user(self, username):
+        user = CustomUser.objects.create_user(
+            f'{username}@example.com', username, 'Имя', 'Фамилия', PASSWORD
+        )
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key
+        )
+        return user, client
+
+    def recipe_data(self, name='Суп'):
+        return {
+            'name': name,
+            'text': 'Сварить',
+            'cooking_time': 10,
+            'image': image(),
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': ingredient.id, 'amount': 10}
+                            for ingredient in self.ingredients],
+        }
+
+    def create_recipe(self):
+        response = self.request(self.author_client, 'post', '/api/recipes/',
+                                self.recipe_data(), 201)
+        return response.json()['id']
+
+    def request(self, client, method, path, data=None, status=200):
+        response = getattr(client, method)(path, data, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status, path)
+        return response
+
+    def test_recipe_reads(self):
+        url = f'/api/recipes/{self.recipe}/'
+        for client in (self.client, self.anonymous):
+            self.request(client, 'get', '/api/recipes/')
+            self.request(client, 'get', '/api/recipes/?tags=tag0&limit=3')
+            self.request(client, 'get', url)
+            self.request(client, 'get', url + 'similar/')
+        self.request(self.anonymous, 'post',
+                     '/api/recipes/shopping_list_preview/',
+                     {'recipes': [{'id': self.recipe}]})
+
+    def test_recipe_writes(self):
+        url = f'/api/recipes/{self.recipe}/'
+        self.request(self.author_client, 'patch', url,
+                     self.recipe_data('Борщ'))
+        self.request(self.author_client, 'put', url, self.recipe_data())
+        self.request(self.author_client, 'delete', url, status=204)
+
+    @override_settings(JOBS_INLINE=True)
+    def test_inline_jobs_are_outside_the_budget(self):
+        self.request(self.author_client, 'delete',
+                     f'/api/recipes/{self.recipe}/', status=204)
+
+    def test_favorites_and_cart(self):
+        url = f'/api/recipes/{self.recipe}/'
+        for action in ('favorite/', 'shopping_cart/'):
+            self.request(self.client, 'post', url + action, status=201)
+        self.request(self.client, 'get',
+                     '/api/recipes/download_shopping_cart/')
+        self.request(self.client, 'get', '/api/recipes/?is_favorited=1')
+        for action in ('favorite/', 'shopping_cart/'):
+            self.request(self.client, 'delete', url + action, status=204)
+
+    def test_users(self):
+        url = f'/api/users/{self.author.id}/'
+        self.request(self.client, 'get', '/api/users/')
+        self.request(self.client, 'get', url)
+        self.request(self.client, 'post', url + 'subscribe/', status=201)
+        self.request(self.client, 'get', '/api/users/subscriptions/')
+        self.request(self.client, 'get', '/api/users/recommended/')
+        self.request(self.client, 'delete', url + 'subscribe/', status=204)
+        self.request(self.anonymous, 'post', '/api/users/', {
+            'email': 'new@example.com', 'username': 'newcomer',
+            'first_name': 'Имя', 'last_name': 'Фамилия',
+            'password': PASSWORD,
+        }, 201)
+
+    def test_me(self):
+        self.request(self.client, 'get', '/api/users/me/')
+        self.request(self.client, 'patch', '/api/users/me/',
+                     {'first_name': 'Другое'})
+        self.request(self.client, 'put', '/api/users/me/', {
+            'email': 'reader@example.com', 'username': 'reader',
+            'first_name': 'Имя', 'last_name': 'Фамилия',
+        })
+        self.request(self.client, 'post', '/api/users/set_password/', {
+            'current_password': PASSWORD, 'new_password': PASSWORD + '1',
+        }, 204)
+        self.request(self.author_client, 'delete', '/api/users/me/',
+                     {'current_password': PASSWORD}, 204)
+
+    def test_dictionaries_and_sync(self):
+        for client in (self.client, self.anonymous):
+            self.request(client, 'get', '/api/tags/')
+            self.request(client, 'get', f'/api/tags/{self.tags[0].id}/')
+            self.request(client, 'get', '/api/ingredients/?name=Инг')
+            self.request(
+                client, 'get', f'/api/ingredients/{self.ingredients[0].id}/'
+            )
+            self.request(client, 'get', '/api/sync/')
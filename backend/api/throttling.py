@@ -0,0 +1,139 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+RATE_REGEX = re.compile(r'^(\d+)/(\d*)([smhd])')
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class LocalBucketStore:
+    max_buckets = 10000
+
+    def __init__(self):
+        # Least recently used first; each bucket keeps the time it is full
+        # again, since scopes with different rates share the store.
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.pop(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self.buckets[key] = (
+                tokens, now, now + (capacity - tokens) / rate
+            )
+            self.prune(now)
+            return wait
+
+    def prune(self, now):
+        # A full bucket is the same as a missing one, so refilled buckets
+        # go first; past the cap the least recently used are evicted.
+        while self.buckets:
+            key, (_, _, full_at) = next(iter(self.buckets.items()))
+            if full_at > now and len(self.buckets) <= self.max_buckets:
+                break
+            del self.buckets[key]
+
+
+class CacheBucketStore:
+    lock_timeout = 1
+    lock_attempts = 20
+    lock_delay = 0.005
+
+    def take(self, key, capacity, rate):
+        key = f'throttle:{key}'
+        # Read-modify-write of the bucket is serialised by a lock taken with
+        # the atomic cache.add; a client that cannot get it is throttled.
+        if not self.acquire(f'{key}:lock'):
+            return self.lock_timeout
+        try:
+            now = time.time()
+            tokens, updated = cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            cache.set(key, (tokens, now), math.ceil(capacity / rate))
+            return wait
+        finally:
+            cache.delete(f'{key}:lock')
+
+    def acquire(self, lock_key):
+        for _ in range(self.lock_attempts):
+            if cache.add(lock_key, True, self.lock_timeout):
+                return True
+            time.sleep(self.lock_delay)
+        return False
+
+
+STORES = {
+    'local': LocalBucketStore(),
+    'cache': CacheBucketStore(),
+}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.capacity, self.rate = self.parse_rate(
+            api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        )
+        self.store = STORES[settings.THROTTLE_BACKEND]
+        self.wait_time = 0
+
+    def parse_rate(self, rate):
+        num, multiplier, period = RATE_REGEX.match(rate).groups()
+        duration = int(multiplier or 1) * DURATIONS[period]
+        return int(num), int(num) / duration
+
+    def applies(self, request, view):
+        return True
+
+    def allow_request(self, request, view):
+        user = request.user
+        if user.is_staff or user.is_superuser:
+            return True
+        if not self.applies(request, view):
+            return True
+        if user.is_authenticated:
+            ident = f'user:{user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        self.wait_time = self.store.take(
+            f'{self.scope}:{ident}', self.capacity, self.rate
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return math.ceil(self.wait_time)
+
+
+class AutocompleteThrottle(TokenBucketThrottle):
+    scope = 'autocomplete'
+
+    def applies(self, request, view):
+        return 'name' in request.query_params
+
+
+class ExportThrottle(TokenBucketThrottle):
+    scope = 'export'
+
+
+class WriteThrottle(TokenBucketThrottle):
+    scope = 'writes'
+
+    def applies(self, request, view):
+        return request.method not in SAFE_METHODS
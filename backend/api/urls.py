@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientsViewSet, RecipeViewSet,
-                    TagViewSet)
+from .views import (BatchView, CustomUserViewSet, IngredientsViewSet,
+                    RecipeViewSet, SyncView, TagViewSet)
 
 app_name = 'api'
 
@@ -13,4 +13,8 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientsViewSet, basename='ingredients')
 
-urlpatterns = [path('', include(router.urls))]
+urlpatterns = [
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('', include(router.urls)),
+]
@@ -1,29 +1,117 @@
-from django.http.response import HttpResponse
-from django.db.models import Sum
+from django.http.response import StreamingHttpResponse
+from django.db.models import (BooleanField, Count, Exists, IntegerField,
+                              OuterRef, Q, Subquery, Value)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from djoser.utils import logout_user
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .batch import Batch
+from .deletion import soft_delete_recipes, soft_delete_users
+from .fast_serializers import (FastRecipeListSerializer,
+                               recipe_cards_by_author)
 from .filters import IngredientNameFilter, RecipeFilter
-from .models import (Favorite, Follow, Ingredient, IngredientInRecipe,
-                     Purchase, Recipe, Tag, User)
+from .mixins import StreamingListMixin
+from .models import (AuthorRecommendation, Favorite, Follow, Ingredient,
+                     Purchase, Recipe, RecipeSignature, Tag, User)
 from .paginators import CustomPagination
 from .permissions import IsOwnerOrAdminOrReadOnly
-from .serializers import (FavoritesSerializer, ListRecipeSerializer,
-                          IngredientSerializer, PurchaseSerializer,
-                          CreateUpdateRecipeSerializer, ShowFollowerSerializer,
-                          TagSerializer, UserSerializer)
+from .serializers import (BatchSerializer, FavoritesSerializer,
+                          IngredientSerializer,
+                          PurchaseSerializer, CreateUpdateRecipeSerializer,
+                          RecommendedAuthorSerializer,
+                          ShoppingListPreviewSerializer,
+                          ShowFollowerSerializer, TagSerializer,
+                          UserListSerializer, get_sparse_fields)
+from .shopping import cart_shopping_list, plan_shopping_list
+from .snapshots import TAG_FIELDS, load_snapshots
+from .sync import DeltaSync
+from .throttling import AutocompleteThrottle, ExportThrottle, WriteThrottle
+
+
+def count_subquery(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()
+    ), 0)
 
 
 class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     pagination_class = CustomPagination
-    serializer_class = UserSerializer
+    serializer_class = UserListSerializer
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
+    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    ordering_fields = ('id', 'username', 'recipes_count', 'followers_count')
+    ordering = ('id',)
+    query_budgets = {
+        'list': 3,
+        'retrieve': 2,
+        'create': 4,
+        'update': 5,
+        'partial_update': 5,
+        'destroy': 14,
+        'me': {'get': 1, 'put': 4, 'patch': 4, 'delete': 13},
+        'subscribe': 7,
+        'delete_subscribe': 4,
+        'subscriptions': 4,
+        'recommended': 3,
+        'set_password': 3,
+        'set_username': 4,
+        'reset_password': 2,
+        'reset_password_confirm': 3,
+        'reset_username': 2,
+        'reset_username_confirm': 3,
+        'activation': 3,
+        'resend_activation': 2,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields, expand = get_sparse_fields(self.request)
+        user = self.request.user
+        if fields is None or 'is_subscribed' in fields:
+            if user.is_authenticated:
+                queryset = queryset.annotate(is_subscribed=Exists(
+                    Follow.objects.filter(user=user, author=OuterRef('pk'))
+                ))
+            else:
+                queryset = queryset.annotate(
+                    is_subscribed=Value(False, output_field=BooleanField())
+                )
+        ordering = self.request.query_params.get('ordering', '')
+        if fields is None or 'recipes_count' in fields or (
+                'recipes_count' in ordering):
+            queryset = queryset.annotate(
+                recipes_count=count_subquery(Recipe.objects.all(), 'author')
+            )
+        if fields is None or 'followers_count' in fields or (
+                'followers_count' in ordering):
+            queryset = queryset.annotate(
+                followers_count=count_subquery(
+                    Follow.objects.filter(user__deleted_at__isnull=True),
+                    'author'
+                )
+            )
+        return queryset
+
+    def perform_destroy(self, instance):
+        if instance == self.request.user:
+            logout_user(self.request)
+        soft_delete_users(User.objects.filter(pk=instance.pk))
 
     @action(
         detail=True,
@@ -63,45 +151,127 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = Follow.objects.filter(
+            user=user, author__deleted_at__isnull=True
+        ).select_related('author').annotate(recipes_count=Count(
+            'author__recipes',
+            filter=Q(author__recipes__deleted_at__isnull=True)
+        )).order_by('id')
         pages = self.paginate_queryset(queryset)
+        limit = request.GET.get('recipes_limit')
+        recipes = recipe_cards_by_author(
+            [follow.author_id for follow in pages],
+            int(limit) if limit else None,
+        )
         serializer = ShowFollowerSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context={'request': request, 'recipes': recipes}
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated]
+    )
+    def recommended(self, request):
+        # Precomputed by update_author_recommendations: one lookup on the
+        # (user, rank) index. Authors followed since the last run are
+        # skipped here rather than waiting for the next one.
+        user = request.user
+        queryset = AuthorRecommendation.objects.filter(
+            user=user, author__deleted_at__isnull=True
+        ).exclude(
+            author__in=Follow.objects.filter(user=user).values('author')
+        ).select_related('author').order_by('rank')
+        pages = self.paginate_queryset(queryset)
+        serializer = RecommendedAuthorSerializer(pages, many=True)
+        return self.get_paginated_response(serializer.data)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
+    stream_fields = TAG_FIELDS
+    query_budgets = {'list': 2, 'retrieve': 2}
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(StreamingListMixin, viewsets.ModelViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     pagination_class = None
+    stream_fields = ('id', 'name', 'measurement_unit')
     permission_classes = (AllowAny,)
     filterset_class = IngredientNameFilter
+    throttle_classes = (AutocompleteThrottle, WriteThrottle)
+    query_budgets = {
+        'list': 2,
+        'retrieve': 2,
+        'create': 2,
+        'update': 3,
+        'partial_update': 3,
+        'destroy': 11,
+    }
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    serializer_class = CreateUpdateRecipeSerializer
+    lookup_value_regex = r'\d+'
     pagination_class = CustomPagination
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
     filter_class = RecipeFilter
+    # Writes scale with the number of ingredients in the payload.
+    query_budgets = {
+        'list': 7,
+        'retrieve': 5,
+        'create': 100,
+        'update': 100,
+        'partial_update': 100,
+        'destroy': 10,
+        'similar': 9,
+        'favorite': 6,
+        'delete_favorite': 4,
+        'shopping_cart': 6,
+        'delete_shopping_cart': 4,
+        'download_shopping_cart': 4,
+        'shopping_list_preview': 3,
+    }
 
-    def get_serializer_class(self):
-        if self.request.method in ('POST', 'PUT', 'PATCH'):
-            return CreateUpdateRecipeSerializer
-        return ListRecipeSerializer
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # Rendered from the snapshot, like the list.
+            return queryset.defer(None).only('id', 'snapshot')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginate_queryset(
+            queryset.values_list('id', 'snapshot')
+        )
+        fields, expand = get_sparse_fields(request)
+        serializer = FastRecipeListSerializer(request, fields, expand)
+        return self.get_paginated_response(
+            serializer.serialize_snapshots(load_snapshots(rows))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        fields, expand = get_sparse_fields(request)
+        serializer = FastRecipeListSerializer(request, fields, expand)
+        return Response(serializer.serialize_snapshots(
+            load_snapshots([(recipe.id, recipe.snapshot)])
+        )[0])
 
     def perform_create(self, serializer):
         return serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        soft_delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
     def recipe_post_method(self, request, AnySerializer, pk):
         user = request.user
         recipe = get_object_or_404(Recipe, id=pk)
@@ -161,25 +331,83 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request, Purchase, pk
         )
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 6)), 50))
+        except ValueError:
+            limit = 6
+        ranked = RecipeSignature.objects.similar_to(recipe.id, limit)
+        fields, expand = get_sparse_fields(request)
+        serializer = FastRecipeListSerializer(request, fields, expand)
+        return Response(serializer.serialize(
+            [recipe_id for similarity, recipe_id in ranked]
+        ))
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        throttle_classes=[ExportThrottle]
+    )
     def download_shopping_cart(self, request):
         user = request.user
-        ingredients = IngredientInRecipe.objects.filter(
-            purchases__user=user).values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
+        ingredients = cart_shopping_list(user)
         filename = f'{user.username}_shopping_list.txt'
-        shopping_list = (
+        header = (
             f'Список покупок({user.first_name})\n'
             f'{timezone.localtime().strftime("%d/%m/%Y %H:%M")}\n\n'
         )
-        for ing in ingredients:
-            shopping_list += (f'{ing["ingredient__name"]}: {ing["amount"]} '
-                              f'{ing["ingredient__measurement_unit"]}\n')
-        shopping_list += '\nFoodgram'
-        response = HttpResponse(
-            shopping_list, content_type='text.txt; charset=utf-8'
+
+        def lines():
+            yield header.encode()
+            for ing in ingredients:
+                yield (f'{ing["name"]}: {ing["amount"]} '
+                       f'{ing["measurement_unit"]}\n').encode()
+            yield '\nFoodgram'.encode()
+
+        response = StreamingHttpResponse(
+            lines(), content_type='text/plain; charset=utf-8'
         )
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+    @action(detail=False, methods=('post',), permission_classes=[AllowAny])
+    def shopping_list_preview(self, request):
+        serializer = ShoppingListPreviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'ingredients': plan_shopping_list(
+            serializer.validated_data['recipes']
+        )})
+
+
+class SyncView(APIView):
+    permission_classes = (AllowAny,)
+    query_budgets = {'get': 6}
+
+    def get(self, request):
+        try:
+            limit = int(request.GET.get('limit', 500))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {'limit': 'Укажите целое число больше нуля.'}
+            )
+        limit = min(limit, 1000)
+        return Response(
+            DeltaSync(request, limit).run(request.GET.get('since'))
+        )
+
+
+class BatchView(APIView):
+    permission_classes = (AllowAny,)
+    throttle_classes = ()
+    # No budget of its own: each sub-request is checked against its view.
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            Batch(request).run(serializer.validated_data['requests'])
+        )
@@ -0,0 +1,41 @@
+import os
+import sys
+
+from django.conf import settings
+
+# Execute wrappers nest in any order, so every one of them is skipped.
+INSTRUMENTATION = ('foodgram/query_budget.py', 'profiling/slow_queries.py')
+
+_project_paths = {}
+
+
+def project_path(filename):
+    if filename not in _project_paths:
+        path = os.path.abspath(filename)
+        base_dir = os.path.abspath(settings.BASE_DIR)
+        _project_paths[filename] = (
+            os.path.relpath(path, base_dir)
+            if path.startswith(base_dir + os.sep) else None
+        )
+    return _project_paths[filename]
+
+
+def frame_name(frame):
+    code = frame.f_code
+    qualname = getattr(code, 'co_qualname', None)
+    if qualname:
+        return qualname
+    instance = frame.f_locals.get('self')
+    if instance is not None:
+        return f'{type(instance).__name__}.{code.co_name}'
+    return code.co_name
+
+
+def callsite():
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = project_path(frame.f_code.co_filename)
+        if path is not None and path not in INSTRUMENTATION:
+            return f'{path}:{frame.f_lineno} {frame_name(frame)}'
+        frame = frame.f_back
+    return '?'
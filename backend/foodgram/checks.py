@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Caches that live inside a single process: stickiness written by one
+# worker would be invisible to the others.
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_replica_cache(app_configs, **kwargs):
+    if not settings.DB_REPLICAS:
+        return []
+    if settings.CACHES['default']['BACKEND'] not in LOCAL_CACHES:
+        return []
+    return [Error(
+        'Реплики БД требуют общего кеша для закрепления клиента '
+        'за основной базой после записи.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION, например Redis '
+             'или Memcached.',
+        id='foodgram.E001',
+    )]
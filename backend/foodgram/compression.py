@@ -0,0 +1,91 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+    def compressor(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def stream(self, chunks):
+        compressor = self.compressor()
+        for chunk in chunks:
+            # A sync flush per chunk lets the client decode what it has
+            # received so far instead of waiting for the whole body.
+            data = compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(
+            data, mode=brotli.MODE_TEXT, quality=self.quality
+        )
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=self.quality
+        )
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+def parse_accept_encoding(header):
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoder(header, encoders):
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for encoder in encoders:
+        weight = weights.get(encoder.name, weights.get('*', 0.0))
+        # Encoders are listed by preference, so ties keep the earlier one.
+        if weight > best_weight:
+            best, best_weight = encoder, weight
+    return best
+
+
+def get_encoders(settings):
+    encoders = []
+    if brotli is not None:
+        encoders.append(BrotliEncoder(settings.COMPRESSION_BROTLI_QUALITY))
+    encoders.append(GzipEncoder(settings.COMPRESSION_GZIP_LEVEL))
+    return encoders
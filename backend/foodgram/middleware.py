@@ -0,0 +1,131 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+from .compression import choose_encoder, get_encoders
+from .query_budget import get_query_budget, should_track
+from .routers import use_primary
+
+
+def sticky_key(client):
+    return 'replica-sticky:' + hashlib.sha1(client.encode()).hexdigest()
+
+
+def stick_to_primary(request, client):
+    # Lets a view keep a credential it has just issued on the primary,
+    # e.g. a login token that the replicas may not have yet.
+    clients = getattr(request, 'replica_sticky_clients', None)
+    if clients is not None:
+        clients.append(client)
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def client(self, request):
+        return (request.META.get('HTTP_AUTHORIZATION')
+                or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+
+    def __call__(self, request):
+        client = self.client(request)
+        request.replica_sticky = bool(
+            client and cache.get(sticky_key(client))
+        )
+        request.replica_sticky_clients = [client] if client else []
+        is_write = request.method not in SAFE_METHODS
+        use_primary(is_write or request.replica_sticky)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary(True)
+        is_write = is_write and not getattr(
+            request, 'replica_read_only', False
+        )
+        if is_write and response.status_code < 400:
+            cache.set_many(
+                {sticky_key(client): True
+                 for client in request.replica_sticky_clients},
+                settings.DB_REPLICA_STICKY_SECONDS,
+            )
+        return response
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        try:
+            response = self.get_response(request)
+        finally:
+            tracker = request.query_budget
+            if tracker is not None:
+                tracker.stop()
+        if tracker is None:
+            return response
+        if response.streaming:
+            response.streaming_content = tracker.wrap(
+                response.streaming_content
+            )
+        else:
+            tracker.check()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not should_track():
+            return None
+        tracker = get_query_budget(view_func, request)
+        if tracker is not None:
+            request.query_budget = tracker.start()
+        return None
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encoders = get_encoders(settings)
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.content_types = settings.COMPRESSION_CONTENT_TYPES
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        return content_type.strip().lower() in self.content_types
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (not response.streaming
+                and len(response.content) < self.min_size):
+            return response
+        encoder = choose_encoder(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encoders
+        )
+        if encoder is None:
+            return response
+        if response.streaming:
+            response.streaming_content = encoder.stream(
+                response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            compressed = encoder.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoder.name
+        return response
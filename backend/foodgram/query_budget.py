@@ -0,0 +1,160 @@
+import logging
+import random
+import threading
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from .callsite import callsite
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, queries, per_item=0):
+        self.queries = queries
+        self.per_item = per_item
+
+    def limit(self, request, view_class):
+        if not self.per_item:
+            return self.queries
+        return self.queries + self.per_item * page_size(request, view_class)
+
+
+def page_size(request, view_class):
+    paginator_class = getattr(view_class, 'pagination_class', None)
+    if paginator_class is None:
+        return 0
+    paginator = paginator_class()
+    size = paginator.page_size or 0
+    param = paginator.page_size_query_param
+    if param and request.GET.get(param, '').isdigit():
+        size = int(request.GET[param])
+        if paginator.max_page_size:
+            size = min(size, paginator.max_page_size)
+    return size
+
+
+def get_query_budget(view_func, request):
+    view_class = getattr(view_func, 'cls', None)
+    budgets = getattr(view_class, 'query_budgets', None)
+    if not budgets:
+        return None
+    actions = getattr(view_func, 'actions', None)
+    method = request.method.lower()
+    name = actions.get(method) if actions else method
+    budget = budgets.get(name)
+    # Actions serving several methods (e.g. users/me) are budgeted
+    # per method.
+    if isinstance(budget, dict):
+        budget = budget.get(method)
+    if budget is None:
+        return None
+    if isinstance(budget, int):
+        budget = QueryBudget(budget)
+    return QueryBudgetTracker(
+        f'{view_class.__name__}.{name}', budget.limit(request, view_class)
+    )
+
+
+class QueryBudgetTracker:
+    def __init__(self, name, limit, mode=None):
+        self.name = name
+        self.limit = limit
+        self.mode = mode or settings.QUERY_BUDGET_MODE
+        self.capture = self.mode in ('raise', 'log')
+        # Cleared once a streaming response is under way: its headers are
+        # sent, so an overrun can only be recorded.
+        self.enforce = True
+        self.failed = False
+        self.count = 0
+        self.queries = []
+        self.stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, 'paused', False):
+            return execute(sql, params, many, context)
+        self.count += 1
+        if self.capture:
+            self.queries.append((sql, callsite()))
+        # Fail the query that goes over budget, inside the view and before
+        # a response exists; only once, so that rollbacks still run.
+        if (self.mode == 'raise' and self.enforce and not self.failed
+                and self.count > self.limit):
+            self.failed = True
+            raise QueryBudgetExceeded(self.report())
+        return execute(sql, params, many, context)
+
+    def start(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def stop(self):
+        self.stack.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def wrap(self, content):
+        self.enforce = False
+        with self:
+            yield from content
+        self.check()
+
+    def report(self):
+        lines = [f'{self.name}: {self.count} запросов к БД '
+                 f'при бюджете {self.limit}']
+        by_callsite = defaultdict(list)
+        for sql, site in self.queries:
+            by_callsite[site].append(sql)
+        for site, queries in sorted(by_callsite.items(),
+                                    key=lambda item: -len(item[1])):
+            lines.append(f'  {len(queries)} x {site}')
+            for sql, count in Counter(queries).most_common(3):
+                lines.append(f'      {count} x {sql[:500]}')
+        return '\n'.join(lines)
+
+    def check(self):
+        exceeded = self.count > self.limit
+        if self.mode == 'metric':
+            logger.info(
+                'query_budget view=%s queries=%d budget=%d exceeded=%d',
+                self.name, self.count, self.limit, exceeded,
+            )
+        elif exceeded and not self.failed:
+            logger.warning(self.report())
+        return not exceeded
+
+
+@contextmanager
+def outside_budget():
+    # Work that normally runs elsewhere, such as inline jobs, is not part
+    # of the request's budget.
+    paused = getattr(_state, 'paused', False)
+    _state.paused = True
+    try:
+        yield
+    finally:
+        _state.paused = paused
+
+
+def should_track():
+    mode = settings.QUERY_BUDGET_MODE
+    if mode == 'off':
+        return False
+    if mode == 'metric':
+        return random.random() < settings.QUERY_BUDGET_SAMPLE_RATE
+    return True
@@ -1,11 +1,19 @@
 import os
+import sys
 
-from dotenv import load_dotenv
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-load_dotenv()
+# In containers the environment comes from env_file, so python-dotenv is
+# only imported when a local .env actually exists.
+ENV_FILES = [
+    os.path.join(path, '.env')
+    for path in (BASE_DIR, os.path.dirname(BASE_DIR))
+    if os.path.exists(os.path.join(path, '.env'))
+]
+if ENV_FILES:
+    from dotenv import load_dotenv
 
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    load_dotenv(ENV_FILES[0])
 
 SECRET_KEY = os.getenv('SECRET_KEY', default='key')
 
@@ -19,8 +27,11 @@ ALLOWED_HOSTS = [
     'web',
 ]
 
+ADMIN_ENABLED = os.getenv('ADMIN_ENABLED', default='True') == 'True'
+
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', default='True') == 'True'
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -32,16 +43,25 @@ INSTALLED_APPS = [
     'django_filters',
     'users',
     'api',
+    'jobs',
+    'profiling',
+    'loadtest',
 ]
 
+if ADMIN_ENABLED:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'profiling.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -75,6 +95,37 @@ DATABASES = {
     }
 }
 
+DB_REPLICAS = []
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+        start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(f'replica_{number}')
+
+DB_REPLICA_STICKY_SECONDS = int(
+    os.getenv('DB_REPLICA_STICKY_SECONDS', default=5)
+)
+
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'foodgram.middleware.ReplicaMiddleware')
+
+# Replica stickiness is kept here, so with DB_REPLICA_HOSTS set the cache
+# must be shared by all workers (see foodgram.checks).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -106,6 +157,31 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+MEDIA_BACKEND = os.getenv('MEDIA_BACKEND', default='filesystem')
+if MEDIA_BACKEND == 's3':
+    DEFAULT_FILE_STORAGE = 'foodgram.storage.ContentAddressedS3Storage'
+    AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+    AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+    AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
+    AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')
+    AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME')
+    AWS_S3_CUSTOM_DOMAIN = os.getenv('AWS_S3_CUSTOM_DOMAIN')
+    AWS_S3_URL_PROTOCOL = os.getenv('AWS_S3_URL_PROTOCOL', default='https:')
+    AWS_QUERYSTRING_AUTH = os.getenv(
+        'AWS_QUERYSTRING_AUTH', default='False'
+    ) == 'True'
+    AWS_QUERYSTRING_EXPIRE = int(
+        os.getenv('AWS_QUERYSTRING_EXPIRE', default=3600)
+    )
+    AWS_DEFAULT_ACL = None
+    AWS_S3_OBJECT_PARAMETERS = {
+        'CacheControl': 'public, max-age=31536000, immutable',
+    }
+else:
+    DEFAULT_FILE_STORAGE = (
+        'foodgram.storage.ContentAddressedFileSystemStorage'
+    )
+
 AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
@@ -117,12 +193,93 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 6
+    'PAGE_SIZE': 6,
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.WriteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'autocomplete': os.getenv('THROTTLE_AUTOCOMPLETE', default='30/10s'),
+        'export': os.getenv('THROTTLE_EXPORT', default='10/m'),
+        'writes': os.getenv('THROTTLE_WRITES', default='60/m'),
+    },
+    # nginx in front of the backend appends the client address to
+    # X-Forwarded-For; anonymous throttling keys on it.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+}
+
+THROTTLE_BACKEND = os.getenv('THROTTLE_BACKEND', default='local')
+
+JOBS_INLINE = os.getenv('JOBS_INLINE', default='False') == 'True'
+
+TESTING = sys.argv[1:2] == ['test']
+
+# raise | log | metric | off; manage.py test runs with raise.
+QUERY_BUDGET_MODE = os.getenv(
+    'QUERY_BUDGET_MODE', default='raise' if DEBUG or TESTING else 'metric'
+)
+QUERY_BUDGET_SAMPLE_RATE = float(
+    os.getenv('QUERY_BUDGET_SAMPLE_RATE', default=0.05)
+)
+
+PROFILER_DIR = os.getenv(
+    'PROFILER_DIR', default=os.path.join(BASE_DIR, 'profiles')
+)
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', default=0.002))
+# Older profiles and their stack files are deleted past this count.
+PROFILER_MAX_PROFILES = int(os.getenv('PROFILER_MAX_PROFILES', default=200))
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', default=6))
+COMPRESSION_BROTLI_QUALITY = int(
+    os.getenv('COMPRESSION_BROTLI_QUALITY', default=5)
+)
+# HTML is left out on purpose: admin pages carry CSRF tokens (BREACH).
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/plain', 'text/csv')
+
+# Queries slower than this many milliseconds are logged; unset or empty
+# disables the log. EXPLAIN runs each slow query again, so it is opt-in.
+SLOW_QUERY_MS = (float(os.getenv('SLOW_QUERY_MS'))
+                 if os.getenv('SLOW_QUERY_MS') else None)
+SLOW_QUERY_EXPLAIN = (
+    os.getenv('SLOW_QUERY_EXPLAIN', default='False') == 'True'
+)
+# Each process logs to this path with its pid inserted before the
+# extension and rotates its own file.
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG',
+    default=os.path.join(BASE_DIR, 'logs', 'slow_queries.log'),
+)
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Query budget metrics (metric mode) are INFO records; overruns in log
+# mode are WARNING.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.query_budget': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_BUDGET_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 DJOSER = {
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import Favorite, Recipe
+from users.models import CustomUser
+
+from .checks import check_replica_cache
+
+REPLICA = 'replica_test'
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+SHARED = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': tempfile.gettempdir(),
+}}
+
+
+class ReplicaCacheCheckTests(TransactionTestCase):
+    @override_settings(DB_REPLICAS=[], CACHES=LOCMEM)
+    def test_no_replicas(self):
+        self.assertEqual(check_replica_cache(None), [])
+
+    @override_settings(DB_REPLICAS=[REPLICA], CACHES=LOCMEM)
+    def test_replicas_with_local_cache(self):
+        errors = check_replica_cache(None)
+        self.assertEqual([error.id for error in errors], ['foodgram.E001'])
+
+    @override_settings(DB_REPLICAS=[REPLICA], CACHES=SHARED)
+    def test_replicas_with_shared_cache(self):
+        self.assertEqual(check_replica_cache(None), [])
+
+
+# The primary is the test database; the replica is a second SQLite file
+# holding a snapshot of it, so anything written later is "replication lag".
+@skipUnless(connection.vendor == 'sqlite', 'нужна SQLite')
+@override_settings(
+    DB_REPLICAS=[REPLICA],
+    DATABASE_ROUTERS=['foodgram.routers.ReplicaRouter'],
+    MIDDLEWARE=['foodgram.middleware.ReplicaMiddleware']
+    + settings.MIDDLEWARE,
+    QUERY_BUDGET_MODE='off',
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user(
+            'author@example.com', 'author', 'Автор', 'Авторов', 'pass12345!'
+        )
+        self.reader = CustomUser.objects.create_user(
+            'reader@example.com', 'reader', 'Читатель', 'Читателев',
+            'pass12345!'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Сварить',
+            cooking_time=10, image='recipes/soup.png',
+        )
+        self.url = f'/api/recipes/{self.recipe.id}/'
+        self.client = self.client_for(self.reader)
+        self.other = self.client_for(self.author)
+        self.snapshot_replica()
+
+    def tearDown(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        os.remove(self.replica_path)
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key
+        )
+        return client
+
+    def snapshot_replica(self):
+        handle, self.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        connection.connection.backup(target)
+        target.close()
+        connections.databases[REPLICA] = {
+            **connections.databases['default'], 'NAME': self.replica_path,
+        }
+        connections.ensure_defaults(REPLICA)
+
+    def is_favorited(self, client):
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['is_favorited']
+
+    def favorite_on_primary(self, user):
+        Favorite.objects.create(user=user, recipe=self.recipe)
+
+    def test_reads_go_to_replica(self):
+        self.favorite_on_primary(self.reader)
+        self.assertFalse(self.is_favorited(self.client))
+
+    def test_writes_go_to_primary(self):
+        response = self.client.post(self.url + 'favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(self.reader.favorite_subscriber.filter(
+            recipe=self.recipe
+        ).exists())
+
+    def test_read_your_writes(self):
+        self.client.post(self.url + 'favorite/')
+        self.assertTrue(self.is_favorited(self.client))
+
+    def test_stickiness_is_per_client(self):
+        self.client.post(self.url + 'favorite/')
+        self.favorite_on_primary(self.author)
+        self.assertFalse(self.is_favorited(self.other))
+
+    def test_stickiness_expires(self):
+        self.client.post(self.url + 'favorite/')
+        cache.clear()
+        self.assertFalse(self.is_favorited(self.client))
+
+    def test_failed_write_is_not_sticky(self):
+        self.client.post('/api/recipes/0/favorite/')
+        self.favorite_on_primary(self.reader)
+        self.assertFalse(self.is_favorited(self.client))
+
+    def login(self, email):
+        response = APIClient().post('/api/auth/token/login/', {
+            'email': email, 'password': 'pass12345!',
+        })
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Token ' + response.json()['auth_token']
+        )
+        return client
+
+    def test_login_token_is_sticky(self):
+        Token.objects.filter(user=self.reader).delete()
+        client = self.login('reader@example.com')
+        response = client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_registration_then_login(self):
+        response = APIClient().post('/api/users/', {
+            'email': 'new@example.com', 'username': 'newcomer',
+            'first_name': 'Новый', 'last_name': 'Пользователь',
+            'password': 'pass12345!',
+        })
+        self.assertEqual(response.status_code, 201)
+        client = self.login('new@example.com')
+        response = client.get('/api/users/me/')
+        self.assertEqual(response.json()['username'], 'newcomer')
@@ -0,0 +1,68 @@
+import inspect
+import logging
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.password_validation import (
+    get_default_password_validators
+)
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+from django.utils import translation
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+SERIALIZER_MODULES = ('api.serializers', 'users.serializers')
+
+
+def warm_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.app_dict
+
+
+def warm_models():
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+
+def warm_serializers():
+    for module_name in SERIALIZER_MODULES:
+        module = import_module(module_name)
+        for serializer_class in vars(module).values():
+            if not (inspect.isclass(serializer_class)
+                    and issubclass(serializer_class, BaseSerializer)
+                    and serializer_class.__module__ == module_name):
+                continue
+            try:
+                serializer_class().fields
+            except Exception:
+                logger.exception('Не удалось прогреть %s', serializer_class)
+
+
+def warm_reference_data():
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+    # CommonPasswordValidator reads its gzipped word list on first use.
+    get_default_password_validators()
+    try:
+        ContentType.objects.get_for_models(*apps.get_models())
+    except DatabaseError:
+        logger.warning('База данных недоступна, кэш типов содержимого пуст')
+    finally:
+        # Connections must not be shared with workers forked from here.
+        connections.close_all()
+
+
+def warm_up():
+    started = time.perf_counter()
+    for step in (warm_urls, warm_models, warm_serializers,
+                 warm_reference_data):
+        step()
+    logger.info('Прогрев занял %.0f мс',
+                (time.perf_counter() - started) * 1000)
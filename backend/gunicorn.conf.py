@@ -0,0 +1,15 @@
+import gc
+import os
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+# The application, its imports and the warm-up in foodgram/wsgi.py run once
+# in the master; workers get the already initialised memory via fork.
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+
+
+def when_ready(server):
+    if preload_app:
+        # Objects that survive start-up are moved out of the collector's
+        # reach, so gc passes in workers do not touch (and copy) their pages.
+        gc.freeze()
@@ -0,0 +1,24 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'progress', 'priority',
+                    'attempts', 'run_at', 'duration', 'locked_by')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('progress', 'created_at', 'started_at',
+                       'heartbeat_at', 'finished_at', 'locked_by', 'result',
+                       'error')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0
+        )
+
+    retry.short_description = 'Перезапустить'
+
+
+admin.site.register(Job, JobAdmin)
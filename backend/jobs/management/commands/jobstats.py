@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        for row in Job.objects.stats(since=since):
+            duration = row['avg_duration']
+            seconds = f'{duration.total_seconds():.3f}с' if duration else '-'
+            self.stdout.write(
+                f'{row["name"]:<50} {row["status"]:<8} '
+                f'{row["count"]:>8} {seconds:>10}'
+            )
+        backlog = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=timezone.now()
+        )
+        oldest = backlog.order_by('run_at').values_list(
+            'run_at', flat=True
+        ).first()
+        lag = (timezone.now() - oldest).total_seconds() if oldest else 0
+        self.stdout.write(
+            f'В очереди: {backlog.count()}, задержка: {lag:.1f}с'
+        )
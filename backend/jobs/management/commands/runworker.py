@@ -0,0 +1,68 @@
+import logging
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from jobs.worker import requeue_stale, run_pending, worker_name
+
+STALE_CHECK_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+
+def work(stop, sleep):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    name = worker_name()
+    last_stale_check = 0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL:
+                requeue_stale()
+                last_stale_check = time.monotonic()
+            done = run_pending(name, limit=100)
+        except DatabaseError:
+            logger.exception('Воркер %s потерял соединение с базой', name)
+            connections.close_all()
+            done = 0
+        if not done:
+            stop.wait(sleep)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих фоновые задачи'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--sleep', type=float, default=1)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задачи из очереди и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            done = run_pending()
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+
+        connections.close_all()
+        stop = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(target=work, args=(stop, options['sleep']))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(f'Запущено воркеров: {len(processes)}')
+        for process in processes:
+            process.join()
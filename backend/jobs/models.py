@@ -0,0 +1,131 @@
+import json
+
+from django.db import models
+from django.db.models import (Avg, Count, DurationField, ExpressionWrapper,
+                              F)
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+    def stats(self, since=None):
+        queryset = self
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        return queryset.values('name', 'status').annotate(
+            count=Count('id'),
+            avg_duration=Avg(ExpressionWrapper(
+                F('finished_at') - F('started_at'),
+                output_field=DurationField(),
+            )),
+        ).order_by('name', 'status')
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=100,
+    )
+    payload = models.TextField(
+        verbose_name='Аргументы',
+        default='{}',
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    priority = models.SmallIntegerField(
+        verbose_name='Приоритет',
+        default=0,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=3,
+    )
+    progress = models.PositiveSmallIntegerField(
+        verbose_name='Прогресс, %',
+        default=0,
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Запустить после',
+        default=timezone.now,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True,
+    )
+    started_at = models.DateTimeField(
+        verbose_name='Начата',
+        null=True,
+        blank=True,
+    )
+    heartbeat_at = models.DateTimeField(
+        verbose_name='Последний сигнал',
+        null=True,
+        blank=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершена',
+        null=True,
+        blank=True,
+    )
+    locked_by = models.CharField(
+        verbose_name='Воркер',
+        max_length=100,
+        blank=True,
+    )
+    result = models.TextField(
+        verbose_name='Результат',
+        blank=True,
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True,
+    )
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+    @property
+    def kwargs(self):
+        return json.loads(self.payload)
+
+    def set_progress(self, done, total):
+        # Doubles as a heartbeat: long jobs that report progress are not
+        # mistaken for ones abandoned by a dead worker.
+        self.progress = min(100, done * 100 // total) if total else 100
+        self.heartbeat_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(
+            progress=self.progress, heartbeat_at=self.heartbeat_at
+        )
+
+    @property
+    def duration(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
@@ -0,0 +1,41 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from foodgram.query_budget import outside_budget
+
+from .models import Job
+
+registry = {}
+
+
+def job(name=None, max_attempts=3, priority=0, bind=False):
+    def decorator(func):
+        job_name = name or f'{func.__module__}.{func.__name__}'
+        func.job_name = job_name
+        func.max_attempts = max_attempts
+        func.priority = priority
+        func.bind = bind
+        registry[job_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, priority=None, delay=None, **kwargs):
+    if settings.JOBS_INLINE:
+        with outside_budget():
+            if func.bind:
+                return func(job=None, **kwargs)
+            return func(**kwargs)
+    run_at = timezone.now()
+    if delay is not None:
+        run_at += timedelta(seconds=delay)
+    return Job.objects.create(
+        name=func.job_name,
+        payload=json.dumps(kwargs),
+        priority=func.priority if priority is None else priority,
+        max_attempts=func.max_attempts,
+        run_at=run_at,
+    )
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 10
+STALE_AFTER = timedelta(minutes=30)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=timezone.now()
+        ).order_by('-priority', 'run_at', 'id').first()
+        if job is None:
+            return None
+        # Conditional update keeps claims exclusive where FOR UPDATE is a
+        # no-op (SQLite).
+        claimed = Job.objects.filter(id=job.id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            attempts=job.attempts + 1,
+            started_at=timezone.now(),
+            heartbeat_at=timezone.now(),
+            finished_at=None,
+            locked_by=worker,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run(job):
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        if func.bind:
+            result = func(job=job, **job.kwargs)
+        else:
+            result = func(**job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+        logger.exception('Задача %s завершилась ошибкой', job)
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+        job.result = json.dumps(result) if result is not None else ''
+    job.save(update_fields=(
+        'status', 'run_at', 'finished_at', 'result', 'error'
+    ))
+    return job
+
+
+def requeue_stale():
+    # Jobs beat on claim and on every progress report, so only those
+    # silent for STALE_AFTER are considered lost.
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING, heartbeat_at__lt=now - STALE_AFTER
+    )
+    # A job that keeps killing its worker would otherwise be retried
+    # forever: a lost run counts as an attempt like a failed one.
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        finished_at=now,
+        locked_by='',
+        error='Воркер перестал отвечать, попытки исчерпаны',
+    )
+    if failed:
+        logger.warning('Зависшие задачи без попыток: %s', failed)
+    return stale.update(status=Job.QUEUED, locked_by='')
+
+
+def run_pending(worker=None, limit=None):
+    worker = worker or worker_name()
+    done = 0
+    while limit is None or done < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job)
+        done += 1
+    return done
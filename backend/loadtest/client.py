@@ -0,0 +1,88 @@
+import gzip
+import http.client
+import json
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+THROTTLED = 429
+
+
+class ScenarioError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class Client:
+    # One keep-alive connection per virtual user, like a browser tab.
+    def __init__(self, base_url, timeout=30):
+        url = urlsplit(base_url)
+        connection_class = (http.client.HTTPSConnection
+                            if url.scheme == 'https'
+                            else http.client.HTTPConnection)
+        self.connection = connection_class(url.netloc, timeout=timeout)
+        self.prefix = url.path.rstrip('/')
+
+    def request(self, method, path, params=None, data=None, token=None):
+        path = self.prefix + path
+        if params:
+            path += '?' + urlencode(params, doseq=True)
+        headers = {'Accept': 'application/json',
+                   'Accept-Encoding': 'gzip'}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.getheader('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return response.status, content, elapsed
+
+    def close(self):
+        self.connection.close()
+
+
+class Session:
+    def __init__(self, client, recorder, random, account, token=None):
+        self.client = client
+        self.recorder = recorder
+        self.random = random
+        self.account = account
+        self.token = token
+
+    def call(self, step, method, path, params=None, data=None,
+             expect=(200,)):
+        try:
+            status, content, elapsed = self.client.request(
+                method, path, params, data, self.token
+            )
+        except (OSError, http.client.HTTPException) as error:
+            self.recorder.add(step, 0, 0, error=type(error).__name__)
+            raise ScenarioError(f'{step}: {error}')
+        self.recorder.add(step, status, elapsed,
+                          error=None if status in expect else str(status))
+        if status not in expect:
+            raise ScenarioError(f'{step}: HTTP {status}', status)
+        if content and content[:1] in (b'{', b'['):
+            return json.loads(content)
+        return content
+
+    def get(self, step, path, **params):
+        return self.call(step, 'GET', path, params)
+
+    def post(self, step, path, data=None, expect=(201,)):
+        return self.call(step, 'POST', path, data=data, expect=expect)
+
+    def delete(self, step, path):
+        return self.call(step, 'DELETE', path, expect=(204,))
@@ -0,0 +1,102 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loadtest.runner import PERCENTILES, run
+from loadtest.scenarios import SCENARIOS
+from loadtest.seed import ACCOUNT_PASSWORD, get_accounts
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет сценарии пользователей SPA против запущенного '
+            'стенда и сравнивает результат с сохранённым отчётом')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Одновременных виртуальных пользователей')
+        parser.add_argument('--duration', type=float, default=60,
+                            help='Длительность прогона, с')
+        parser.add_argument('--scenario', action='append',
+                            choices=sorted(SCENARIOS))
+        parser.add_argument('--think-time', type=float, default=0,
+                            help='Средняя пауза между сценариями, мс')
+        parser.add_argument('--accounts', type=int, default=200,
+                            help='Сколько аккаунтов создал seed_loadtest')
+        parser.add_argument('--password', default=ACCOUNT_PASSWORD)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Сохранить отчёт в JSON')
+        parser.add_argument('--baseline', help='JSON-отчёт для сравнения')
+        parser.add_argument('--threshold', type=float, default=10,
+                            help='Допустимый рост p95, %%')
+
+    def handle(self, *args, **options):
+        if options['users'] > options['accounts']:
+            raise CommandError('Виртуальных пользователей больше, '
+                               'чем аккаунтов.')
+        report = run(
+            options['base_url'],
+            get_accounts(options['accounts'], options['password']),
+            options['users'],
+            options['duration'],
+            options['scenario'],
+            options['think_time'],
+            options['seed'],
+        )
+        columns = ''.join(f'{f"p{share}":>9}' for share in PERCENTILES)
+        self.stdout.write(
+            f'{"шаг":<28} {"запросов":>9} {"ошибок":>7} {"429":>6} '
+            f'{"в сек":>8}{columns}{"max":>9}'
+        )
+        for step, stats in report['steps'].items():
+            timings = ''.join(f'{stats.get(f"p{share}", 0):>9.1f}'
+                              for share in PERCENTILES)
+            self.stdout.write(
+                f'{step:<28} {stats["count"]:>9} {stats["errors"]:>7} '
+                f'{stats["throttled"]:>6} {stats["rps"]:>8.1f}{timings}'
+                f'{stats.get("max", 0):>9.1f}'
+            )
+            for error, count in stats.get('error_codes', {}).items():
+                self.stdout.write(f'  {count:>6} x {error}')
+        if any(stats['throttled'] for stats in report['steps'].values()):
+            self.stderr.write(
+                'Часть запросов отклонена лимитами (429): задержки по этим '
+                'шагам не сравнимы. Поднимите THROTTLE_WRITES, '
+                'THROTTLE_EXPORT и THROTTLE_AUTOCOMPLETE на время прогона.'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['threshold'])
+
+    def compare(self, report, path, threshold):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write('Изменения относительно базового отчёта:')
+        regressions = []
+        steps = baseline['steps']
+        for step in sorted(set(report['steps']) | set(steps)):
+            before, stats = steps.get(step), report['steps'].get(step)
+            if before is None or stats is None:
+                self.stdout.write(f'  {step:<28} '
+                                  + ('новый шаг' if before is None
+                                     else 'не выполнялся'))
+                continue
+            if stats['errors'] > before['errors']:
+                regressions.append(step)
+            if 'p95' not in before or 'p95' not in stats:
+                continue
+            change = ((stats['p95'] / before['p95'] - 1) * 100
+                      if before['p95'] else 0)
+            self.stdout.write(
+                f'  {step:<28} p95 {before["p95"]:>8.1f} -> '
+                f'{stats["p95"]:>8.1f} мс ({change:+.0f}%), '
+                f'в сек {before["rps"]:.1f} -> {stats["rps"]:.1f}, '
+                f'ошибок {before["errors"]} -> {stats["errors"]}, '
+                f'429 {before.get("throttled", 0)} -> {stats["throttled"]}'
+            )
+            if change > threshold and step not in regressions:
+                regressions.append(step)
+        if regressions:
+            raise CommandError('Стало хуже: ' + ', '.join(regressions))
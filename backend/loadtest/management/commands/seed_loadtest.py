@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from loadtest.seed import ACCOUNT_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = ('Создаёт пользователей, рецепты и подписки для нагрузочного '
+            'тестирования, повторный запуск дополняет недостающее')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=5,
+                            help='Подписок у каждого пользователя')
+        parser.add_argument('--password', default=ACCOUNT_PASSWORD)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        users, recipes = seed(
+            options['users'], options['recipes'], options['follows'],
+            options['password'], options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {users}, создано рецептов: {recipes}'
+        ))
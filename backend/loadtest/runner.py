@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from .client import THROTTLED, Client, ScenarioError, Session
+from .scenarios import SCENARIOS, login, logout
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Recorder:
+    # One recorder per virtual user, merged after the run: no locking on
+    # the hot path.
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.throttled = Counter()
+
+    def add(self, step, status, elapsed, error=None):
+        # A 429 is the rate limit doing its job, not a failure of the
+        # endpoint, and its fast response would skew the latencies.
+        if status == THROTTLED:
+            self.throttled[step] += 1
+        elif error is None:
+            self.timings[step].append(elapsed)
+        else:
+            self.errors[step][error] += 1
+
+    def merge(self, other):
+        for step, timings in other.timings.items():
+            self.timings[step].extend(timings)
+        for step, errors in other.errors.items():
+            self.errors[step].update(errors)
+        self.throttled.update(other.throttled)
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share / 100))]
+
+
+def summarize(recorder, elapsed):
+    steps = {}
+    for step in sorted(set(recorder.timings) | set(recorder.errors)
+                       | set(recorder.throttled)):
+        timings = sorted(recorder.timings[step])
+        errors = recorder.errors[step]
+        stats = {
+            'count': len(timings),
+            'errors': sum(errors.values()),
+            'throttled': recorder.throttled[step],
+            'rps': round(len(timings) / elapsed, 2),
+        }
+        if timings:
+            stats.update({f'p{share}': round(percentile(timings, share), 2)
+                          for share in PERCENTILES})
+            stats['max'] = round(timings[-1], 2)
+        if errors:
+            stats['error_codes'] = dict(errors)
+        steps[step] = stats
+    return steps
+
+
+def virtual_user(base_url, scenarios, account, seed, deadline, think_time,
+                 recorder):
+    rng = random.Random(seed)
+    names = list(scenarios)
+    weights = [SCENARIOS[name][1] for name in names]
+    client = Client(base_url)
+    # Logs in once and reuses the token, like a browser tab: a login per
+    # journey would measure the login endpoint and its rate limit.
+    token = None
+    try:
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            journey, weight, authenticated = SCENARIOS[name]
+            started = time.perf_counter()
+            try:
+                if authenticated and token is None:
+                    token = login(Session(client, recorder, rng, account))
+                journey(Session(client, recorder, rng, account,
+                                token if authenticated else None))
+            except ScenarioError as error:
+                recorder.add(f'journey:{name}', error.status, 0,
+                             error=str(error))
+                if error.status == 401:
+                    token = None
+            else:
+                recorder.add(f'journey:{name}', 200,
+                             (time.perf_counter() - started) * 1000)
+            if think_time:
+                time.sleep(rng.expovariate(1000 / think_time))
+    finally:
+        if token is not None:
+            try:
+                logout(Session(client, recorder, rng, account, token))
+            except ScenarioError:
+                pass
+        client.close()
+
+
+def run(base_url, accounts, users, duration, scenarios=None, think_time=0,
+        seed=0):
+    if users > len(accounts):
+        raise ValueError('Виртуальных пользователей больше, чем аккаунтов.')
+    scenarios = scenarios or list(SCENARIOS)
+    recorders = [Recorder() for _ in range(users)]
+    started = time.monotonic()
+    deadline = started + duration
+    # Each virtual user owns an account: concurrent journeys of one account
+    # would trip over each other's favorites and tokens.
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(base_url, scenarios, accounts[index],
+                  seed + index, deadline, think_time, recorders[index]),
+            daemon=True,
+        )
+        for index in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    total = Recorder()
+    for recorder in recorders:
+        total.merge(recorder)
+    return {
+        'base_url': base_url,
+        'users': users,
+        'duration': round(elapsed, 1),
+        'scenarios': scenarios,
+        'seed': seed,
+        'steps': summarize(total, elapsed),
+    }
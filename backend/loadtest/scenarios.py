@@ -0,0 +1,132 @@
+from .client import ScenarioError
+
+# Step names are the keys of the report, keep them stable between
+# releases so that results stay comparable.
+
+
+def login(session):
+    data = session.post('auth:login', '/api/auth/token/login/', {
+        'email': session.account['email'],
+        'password': session.account['password'],
+    }, expect=(200, 201))
+    session.token = data['auth_token']
+    session.get('users:me', '/api/users/me/')
+    return session.token
+
+
+def logout(session):
+    session.post('auth:logout', '/api/auth/token/logout/', expect=(204,))
+    session.token = None
+
+
+def undo(session, steps):
+    # Runs every step even if one fails, so that the account is left clean
+    # for its next journey, then reports the first failure.
+    failed = None
+    for step, path in steps:
+        try:
+            session.delete(step, path)
+        except ScenarioError as error:
+            failed = failed or error
+    if failed is not None:
+        raise failed
+
+
+def browse_recipes(session, tags):
+    params = {'tags': session.random.sample(
+        tags, min(len(tags), session.random.randint(1, 2))
+    )}
+    page = session.get('recipes:list_tags', '/api/recipes/', **params)
+    if page['next']:
+        session.get('recipes:list_page', '/api/recipes/', page=2, **params)
+    recipes = [recipe['id'] for recipe in page['results']]
+    if not recipes:
+        page = session.get('recipes:list', '/api/recipes/')
+        recipes = [recipe['id'] for recipe in page['results']]
+    if not recipes:
+        raise ScenarioError('Нет рецептов, запустите seed_loadtest.')
+    return recipes
+
+
+def anonymous(session):
+    tags = [tag['slug'] for tag in session.get('tags:list', '/api/tags/')]
+    recipes = browse_recipes(session, tags)
+    recipe_id = session.random.choice(recipes)
+    session.get('recipes:detail', f'/api/recipes/{recipe_id}/')
+    session.get('recipes:similar', f'/api/recipes/{recipe_id}/similar/')
+
+
+def shopper(session):
+    favorited, in_cart = [], []
+    try:
+        tags = [tag['slug']
+                for tag in session.get('tags:list', '/api/tags/')]
+        recipes = browse_recipes(session, tags)
+        picked = session.random.sample(recipes, min(3, len(recipes)))
+        session.get('recipes:detail', f'/api/recipes/{picked[0]}/')
+        session.post('recipes:favorite',
+                     f'/api/recipes/{picked[0]}/favorite/')
+        favorited.append(picked[0])
+        session.get('recipes:list_favorited', '/api/recipes/',
+                    is_favorited=1)
+        for recipe_id in picked:
+            session.post('recipes:cart_add',
+                         f'/api/recipes/{recipe_id}/shopping_cart/')
+            in_cart.append(recipe_id)
+        session.get('recipes:list_cart', '/api/recipes/',
+                    is_in_shopping_cart=1)
+        session.get('recipes:download_cart',
+                    '/api/recipes/download_shopping_cart/')
+    finally:
+        # Everything added is removed again, also after a failed step, so
+        # journeys can repeat without "already added" errors.
+        undo(session, [
+            ('recipes:cart_remove',
+             f'/api/recipes/{recipe_id}/shopping_cart/')
+            for recipe_id in in_cart
+        ] + [
+            ('recipes:unfavorite', f'/api/recipes/{recipe_id}/favorite/')
+            for recipe_id in favorited
+        ])
+
+
+def follower(session):
+    subscribed = []
+    try:
+        session.get('users:recommended', '/api/users/recommended/')
+        # The user list only shows the caller to non-staff accounts, so
+        # authors are found the way the SPA does it: from recipe cards.
+        page = session.get('recipes:list', '/api/recipes/',
+                           page=session.random.randint(1, 3))
+        authors = []
+        for author_id in {recipe['author']['id']
+                          for recipe in page['results']}:
+            author = session.get('users:detail', f'/api/users/{author_id}/')
+            if (not author['is_subscribed']
+                    and author['email'] != session.account['email']):
+                authors.append(author_id)
+        authors = session.random.sample(authors, min(2, len(authors)))
+        for author_id in authors:
+            session.post('users:subscribe',
+                         f'/api/users/{author_id}/subscribe/')
+            subscribed.append(author_id)
+            session.get('recipes:list_author', '/api/recipes/',
+                        author=author_id)
+        page = session.get('users:subscriptions',
+                           '/api/users/subscriptions/', recipes_limit=3)
+        if page['next']:
+            session.get('users:subscriptions_page',
+                        '/api/users/subscriptions/', page=2, recipes_limit=3)
+    finally:
+        undo(session, [
+            ('users:unsubscribe', f'/api/users/{author_id}/subscribe/')
+            for author_id in subscribed
+        ])
+
+
+# name: (journey, weight, runs with the virtual user's token)
+SCENARIOS = {
+    'anonymous': (anonymous, 5, False),
+    'shopper': (shopper, 3, True),
+    'follower': (follower, 2, True),
+}
@@ -0,0 +1,124 @@
+import io
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from PIL import Image
+
+from api.models import Follow, Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import CustomUser
+
+ACCOUNT_EMAIL = 'loadtest{}@example.com'
+ACCOUNT_PASSWORD = 'loadtest-password'
+TAGS = (
+    ('breakfast', 'Завтрак', '#E26C2D'),
+    ('lunch', 'Обед', '#49B64E'),
+    ('dinner', 'Ужин', '#8775D2'),
+)
+MIN_INGREDIENTS = 50
+RECIPE_BATCH_SIZE = 100
+
+
+def get_accounts(count, password=ACCOUNT_PASSWORD):
+    return [{'email': ACCOUNT_EMAIL.format(index), 'password': password}
+            for index in range(count)]
+
+
+def seed_users(count, password):
+    emails = [account['email'] for account in get_accounts(count)]
+    existing = set(CustomUser.all_objects.filter(
+        email__in=emails
+    ).values_list('email', flat=True))
+    # Hashing is deliberately slow, one hash serves every account.
+    password = make_password(password)
+    CustomUser.objects.bulk_create([
+        CustomUser(email=email, username=email.split('@')[0],
+                   first_name='Нагрузка', last_name=str(index),
+                   password=password)
+        for index, email in enumerate(emails) if email not in existing
+    ])
+    return list(CustomUser.all_objects.filter(
+        email__in=emails
+    ).order_by('id').values_list('id', flat=True))
+
+
+def seed_tags():
+    return [
+        Tag.objects.get_or_create(
+            slug=slug, defaults={'name': name, 'color': color}
+        )[0].id
+        for slug, name, color in TAGS
+    ]
+
+
+def seed_ingredients():
+    ingredients = list(Ingredient.objects.order_by('id').values_list(
+        'id', flat=True
+    )[:MIN_INGREDIENTS * 10])
+    if len(ingredients) < MIN_INGREDIENTS:
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(len(ingredients), MIN_INGREDIENTS)
+        ])
+        return seed_ingredients()
+    return ingredients
+
+
+def seed_image():
+    content = io.BytesIO()
+    Image.new('RGB', (64, 64), '#E26C2D').save(content, 'PNG')
+    return default_storage.save(
+        'recipes/loadtest.png', ContentFile(content.getvalue())
+    )
+
+
+def seed_recipes(count, authors, tags, ingredients, rng):
+    existing = Recipe.objects.filter(author_id__in=authors).count()
+    image = seed_image()
+    for start in range(existing, count, RECIPE_BATCH_SIZE):
+        with transaction.atomic():
+            for index in range(start, min(start + RECIPE_BATCH_SIZE, count)):
+                recipe = Recipe.objects.create(
+                    author_id=authors[index % len(authors)],
+                    name=f'Рецепт нагрузки {index}',
+                    text='Рецепт для нагрузочного тестирования.',
+                    cooking_time=rng.randint(5, 120),
+                    image=image,
+                )
+                recipe.ingredients.set([
+                    IngredientInRecipe.objects.get_or_create(
+                        ingredient_id=ingredient_id,
+                        amount=rng.choice((1, 2, 5, 10, 50, 100, 250)),
+                    )[0]
+                    for ingredient_id in rng.sample(
+                        ingredients, rng.randint(3, 10)
+                    )
+                ])
+                recipe.tags.set(rng.sample(tags, rng.randint(1, 2)))
+    return count - existing
+
+
+def seed_follows(authors, follows):
+    Follow.objects.bulk_create([
+        Follow(user_id=user_id,
+               author_id=authors[(index + offset) % len(authors)])
+        for index, user_id in enumerate(authors)
+        for offset in range(1, min(follows, len(authors) - 1) + 1)
+    ], ignore_conflicts=True)
+
+
+def seed(users, recipes, follows, password=ACCOUNT_PASSWORD, seed=0):
+    rng = random.Random(seed)
+    authors = seed_users(users, password)
+    created = seed_recipes(
+        recipes, authors, seed_tags(), seed_ingredients(), rng
+    )
+    seed_follows(authors, follows)
+    if created:
+        # Same bookkeeping the serializer schedules per recipe, in bulk.
+        call_command('rebuild_recipe_indexes', verbosity=0)
+        call_command('update_recipe_scores', verbosity=0)
+    return len(authors), created
@@ -0,0 +1,63 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from .models import RequestProfile
+from .storage import profile_path
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code',
+                    'duration_ms', 'samples', 'user')
+    list_filter = ('method', 'status_code')
+    search_fields = ('path',)
+    readonly_fields = ('created_at', 'user', 'method', 'path', 'status_code',
+                       'duration_ms', 'samples', 'phase_table', 'download')
+    exclude = ('phases', 'filename')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:profile_id>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='profiling_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, profile_id):
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        try:
+            file = open(profile_path(profile.filename), 'rb')
+        except FileNotFoundError:
+            raise Http404('Файл профиля не найден')
+        return FileResponse(
+            file, as_attachment=True, filename=profile.filename,
+            content_type='text/plain; charset=utf-8',
+        )
+
+    def phase_table(self, obj):
+        return format_html(
+            '<table>{}</table>',
+            format_html_join('', '<tr><td>{}</td><td>{}</td></tr>',
+                             obj.phase_times.items()),
+        )
+
+    phase_table.short_description = 'Время по фазам, мс'
+
+    def download(self, obj):
+        url = reverse('admin:profiling_requestprofile_download',
+                      args=(obj.pk,))
+        return format_html(
+            '<a href="{}">{}</a> (collapsed stacks: speedscope, '
+            'flamegraph.pl)', url, obj.filename,
+        )
+
+    download.short_description = 'Стеки'
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
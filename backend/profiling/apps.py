@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class ProfilingConfig(AppConfig):
+    name = 'profiling'
+    verbose_name = 'Профилирование'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .slow_queries import install
+
+        connection_created.connect(install)
@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_RE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$'
+)
+
+
+def measure(warmup):
+    env = dict(os.environ, STARTUP_WARMUP=str(warmup))
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import foodgram.wsgi'],
+        env=env,
+        cwd=settings.BASE_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    wall = time.perf_counter() - started
+    if process.returncode:
+        raise CommandError(process.stderr[-2000:])
+    modules = {}
+    packages = Counter()
+    total = 0
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match is None:
+            continue
+        own, cumulative, indent, name = match.groups()
+        modules[name] = int(cumulative)
+        packages[name.split('.')[0]] += int(own)
+        if not indent:
+            total += int(cumulative)
+    return {
+        'wall_ms': round(wall * 1000),
+        'import_ms': round(total / 1000),
+        'packages': {name: round(us / 1000, 1)
+                     for name, us in packages.most_common()},
+        'modules': {name: round(us / 1000, 1)
+                    for name, us in sorted(modules.items(),
+                                           key=lambda item: -item[1])},
+    }
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время импорта приложения в отдельном процессе '
+            'и сравнивает его с сохранённым отчётом')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--warmup', action='store_true',
+                            help='Учитывать прогрев из foodgram/wsgi.py')
+        parser.add_argument('--output', help='Сохранить отчёт в JSON')
+        parser.add_argument('--baseline', help='JSON-отчёт для сравнения')
+        parser.add_argument('--threshold', type=float, default=10,
+                            help='Допустимый рост времени импорта, %%')
+
+    def handle(self, *args, **options):
+        report = measure(options['warmup'])
+        self.stdout.write(
+            f'Запуск процесса: {report["wall_ms"]} мс, '
+            f'импорт: {report["import_ms"]} мс'
+        )
+        self.stdout.write('Пакеты (собственное время, мс):')
+        for name, ms in list(report['packages'].items())[:options['top']]:
+            self.stdout.write(f'  {ms:>8.1f} {name}')
+        self.stdout.write('Модули (с учётом вложенных, мс):')
+        for name, ms in list(report['modules'].items())[:options['top']]:
+            self.stdout.write(f'  {ms:>8.1f} {name}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['threshold'])
+
+    def compare(self, report, path, threshold):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write('Изменения относительно базового отчёта:')
+        for name, ms in report['packages'].items():
+            before = baseline['packages'].get(name, 0)
+            if ms - before >= 1:
+                self.stdout.write(f'  +{ms - before:>7.1f} {name}')
+        limit = baseline['import_ms'] * (1 + threshold / 100)
+        if report['import_ms'] > limit:
+            raise CommandError(
+                f'Время импорта выросло: {baseline["import_ms"]} мс -> '
+                f'{report["import_ms"]} мс'
+            )
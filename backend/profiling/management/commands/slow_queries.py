@@ -0,0 +1,75 @@
+import glob
+import json
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def log_files(path):
+    # Every worker process writes <name>.<pid><ext> and rotates it to
+    # <name>.<pid><ext>.1 and so on.
+    root, ext = os.path.splitext(path)
+    return sorted(glob.glob(f'{root}.[0-9]*{ext}')
+                  + glob.glob(f'{root}.[0-9]*{ext}.[0-9]*'))
+
+
+class Command(BaseCommand):
+    help = 'Сводка журнала медленных запросов по отпечаткам SQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG)
+        parser.add_argument('--hours', type=int, default=None)
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--explain', action='store_true',
+                            help='Показывать план выполнения')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['hours'])
+        groups = {}
+        for name in log_files(options['log']):
+            with open(name, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since and parse_datetime(entry['ts']) < since:
+                        continue
+                    group = groups.setdefault(entry['fingerprint'], {
+                        'sql': entry['sql'],
+                        'count': 0,
+                        'total': 0,
+                        'max': 0,
+                        'callsites': Counter(),
+                        'explain': None,
+                    })
+                    group['count'] += 1
+                    group['total'] += entry['ms']
+                    group['max'] = max(group['max'], entry['ms'])
+                    group['callsites'][entry['callsite']] += 1
+                    if entry.get('explain'):
+                        group['explain'] = entry['explain']
+        if not groups:
+            self.stdout.write('Медленных запросов нет')
+            return
+        ranked = sorted(groups.items(), key=lambda item: -item[1]['total'])
+        for key, group in ranked[:options['top']]:
+            self.stdout.write(
+                f'{key} {group["count"]:>6} раз '
+                f'всего {group["total"]:.0f}мс '
+                f'среднее {group["total"] / group["count"]:.1f}мс '
+                f'макс {group["max"]:.1f}мс'
+            )
+            self.stdout.write(f'    {group["sql"][:300]}')
+            for site, count in group['callsites'].most_common(3):
+                self.stdout.write(f'    {count:>6} x {site}')
+            if options['explain'] and group['explain']:
+                for line in group['explain'].splitlines():
+                    self.stdout.write(f'      | {line}')
@@ -0,0 +1,68 @@
+import json
+import threading
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import RequestProfile
+from .sampler import Sampler
+from .storage import write_profile
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+
+
+def get_staff_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        drf_request = Request(request, authenticators=[
+            auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            user = drf_request.user
+        except APIException:
+            return None
+    if user.is_authenticated and user.is_staff:
+        return user
+    return None
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def requested(self, request):
+        if request.META.get(PROFILE_HEADER):
+            return True
+        return (PROFILE_PARAM in request.META.get('QUERY_STRING', '')
+                and bool(request.GET.get(PROFILE_PARAM)))
+
+    def __call__(self, request):
+        if not self.requested(request):
+            return self.get_response(request)
+        # Credentials are only looked at when profiling was asked for.
+        user = get_staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        sampler = Sampler(
+            threading.get_ident(), settings.PROFILER_INTERVAL
+        ).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status_code=response.status_code,
+            duration_ms=round(sampler.duration * 1000, 1),
+            samples=sampler.samples,
+            phases=json.dumps(sampler.phase_times()),
+            filename=write_profile(sampler.collapsed()),
+        )
+        RequestProfile.objects.prune(settings.PROFILER_MAX_PROFILES)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfileManager(models.Manager):
+    def prune(self, keep):
+        # Deleting through the queryset fires post_delete per profile,
+        # which removes its stack file.
+        stale = list(self.order_by('-created_at', '-pk').values_list(
+            'pk', flat=True
+        )[keep:])
+        if stale:
+            self.filter(pk__in=stale).delete()
+
+
+class RequestProfile(models.Model):
+    created_at = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True,
+        db_index=True,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name='Пользователь',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    method = models.CharField(
+        verbose_name='Метод',
+        max_length=10,
+    )
+    path = models.CharField(
+        verbose_name='Адрес',
+        max_length=2000,
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа',
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Длительность, мс',
+    )
+    samples = models.PositiveIntegerField(
+        verbose_name='Сэмплов',
+    )
+    phases = models.TextField(
+        verbose_name='Время по фазам, мс',
+        default='{}',
+    )
+    filename = models.CharField(
+        verbose_name='Файл со стеками',
+        max_length=255,
+    )
+
+    objects = RequestProfileManager()
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} мс)'
+
+    @property
+    def phase_times(self):
+        return json.loads(self.phases)
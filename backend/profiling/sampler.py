@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Innermost matching frame decides the phase of a sample.
+PHASES = (
+    ('db', ('django/db/',)),
+    ('filter', ('django_filters/', 'api/filters.py')),
+    ('serializer', ('rest_framework/serializers.py',
+                    'rest_framework/fields.py',
+                    'rest_framework/relations.py',
+                    'api/serializers.py', 'api/fast_serializers.py')),
+    ('render', ('rest_framework/renderers.py', 'api/renderers.py')),
+    ('view', ('rest_framework/views.py', 'rest_framework/viewsets.py',
+              'api/views.py')),
+)
+
+
+def frame_label(code):
+    filename = code.co_filename.replace(os.sep, '/')
+    for prefix in sys.path:
+        prefix = prefix.replace(os.sep, '/').rstrip('/') + '/'
+        if prefix != '/' and filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def phase_of(codes):
+    for code in codes:
+        filename = code.co_filename.replace(os.sep, '/')
+        for phase, patterns in PHASES:
+            if any(pattern in filename for pattern in patterns):
+                return phase
+    return 'other'
+
+
+class Sampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.phases = Counter()
+        self.labels = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        # The request thread would otherwise hold the GIL for the whole
+        # default switch interval (5 ms) between samples.
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.switch_interval, self.interval / 2))
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.duration = time.perf_counter() - self.started
+        sys.setswitchinterval(self.switch_interval)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            del frame
+            if not codes:
+                continue
+            self.phases[phase_of(codes)] += 1
+            self.stacks[tuple(reversed(codes))] += 1
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def label(self, code):
+        if code not in self.labels:
+            self.labels[code] = frame_label(code)
+        return self.labels[code]
+
+    def collapsed(self):
+        lines = (
+            ';'.join(self.label(code) for code in stack) + f' {count}'
+            for stack, count in self.stacks.most_common()
+        )
+        return '\n'.join(lines) + '\n'
+
+    def phase_times(self):
+        total = self.samples
+        if not total:
+            return {}
+        return {
+            phase: round(count / total * self.duration * 1000, 1)
+            for phase, count in self.phases.most_common()
+        }
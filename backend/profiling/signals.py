@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import RequestProfile
+from .storage import delete_profile
+
+
+@receiver(post_delete, sender=RequestProfile)
+def remove_profile_file(sender, instance, **kwargs):
+    delete_profile(instance.filename)
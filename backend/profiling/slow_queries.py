@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.utils import timezone
+
+from foodgram.callsite import callsite
+
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+EXPLAINED_CACHE_SIZE = 1000
+
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+SPACE_RE = re.compile(r'\s+')
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def process_log_path(path):
+    root, ext = os.path.splitext(path)
+    return f'{root}.{os.getpid()}{ext}'
+
+
+def get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            os.makedirs(os.path.dirname(settings.SLOW_QUERY_LOG),
+                        exist_ok=True)
+            # One file per process: gunicorn workers rotating a shared
+            # file would rename it under each other and lose entries.
+            handler = RotatingFileHandler(
+                process_log_path(settings.SLOW_QUERY_LOG),
+                maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger('profiling.slow_queries')
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _logger = logger
+    return _logger
+
+
+def normalize(sql):
+    sql = PLACEHOLDER_LIST_RE.sub('(%s, ...)', sql)
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+def params_shape(params, many):
+    if many:
+        params = list(params or ())
+        first = params_shape(params[0], False) if params else '[]'
+        return f'{len(params)} x {first}'
+    if params is None:
+        return '-'
+    if isinstance(params, dict):
+        params = params.values()
+    shape = []
+    for value in params:
+        if isinstance(value, (list, tuple)):
+            shape.append(f'{type(value).__name__}[{len(value)}]')
+        else:
+            shape.append(type(value).__name__)
+    return '[' + ', '.join(shape) + ']'
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms, explain):
+        self.threshold = threshold_ms / 1000
+        self.explain_enabled = explain
+        self.explained = OrderedDict()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.record(sql, params, many, context, duration)
+        return result
+
+    def record(self, sql, params, many, context, duration):
+        connection = context['connection']
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        entry = {
+            'ts': timezone.now().isoformat(),
+            'db': connection.alias,
+            'ms': round(duration * 1000, 1),
+            'fingerprint': key,
+            'sql': normalized,
+            'params': params_shape(params, many),
+            'callsite': callsite(),
+            'explain': None,
+        }
+        if self.explain_enabled and not many and key not in self.explained:
+            entry['explain'] = self.explain(connection, sql, params)
+            self.explained[key] = True
+            if len(self.explained) > EXPLAINED_CACHE_SIZE:
+                self.explained.popitem(last=False)
+        get_logger().info(json.dumps(entry, ensure_ascii=False))
+
+    @staticmethod
+    def explain(connection, sql, params):
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+        if prefix is None or not sql.lstrip().upper().startswith(
+                ('SELECT', 'WITH')):
+            return None
+        if connection.needs_rollback:
+            return None
+        # A bare backend cursor skips execute_wrappers, so the EXPLAIN is
+        # neither logged again nor counted against query budgets.
+        cursor = connection.create_cursor()
+        savepoint = connection.in_atomic_block
+        try:
+            if savepoint:
+                cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+            except connection.Database.Error as error:
+                if savepoint:
+                    cursor.execute(
+                        'ROLLBACK TO SAVEPOINT slow_query_explain'
+                    )
+                return f'EXPLAIN не удался: {error}'
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        finally:
+            cursor.close()
+        return '\n'.join(
+            ' '.join(str(value) for value in row) for row in rows
+        )
+
+
+def install(sender, connection, **kwargs):
+    if settings.SLOW_QUERY_MS is None:
+        return
+    if any(isinstance(wrapper, SlowQueryLog)
+           for wrapper in connection.execute_wrappers):
+        return
+    # execute_wrapper() context managers pop the last element on exit, so a
+    # permanent wrapper has to stay in front of them.
+    connection.execute_wrappers.insert(
+        0, SlowQueryLog(settings.SLOW_QUERY_MS, settings.SLOW_QUERY_EXPLAIN)
+    )
@@ -0,0 +1,23 @@
+import os
+import uuid
+
+from django.conf import settings
+
+
+def profile_path(filename):
+    return os.path.join(settings.PROFILER_DIR, filename)
+
+
+def write_profile(content):
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    filename = f'{uuid.uuid4().hex}.collapsed'
+    with open(profile_path(filename), 'w', encoding='utf-8') as file:
+        file.write(content)
+    return filename
+
+
+def delete_profile(filename):
+    try:
+        os.remove(profile_path(filename))
+    except FileNotFoundError:
+        pass
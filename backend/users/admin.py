@@ -2,10 +2,14 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 
+from api.deletion import soft_delete_users
+from api.mixins import SoftDeleteAdminMixin
+
 User = get_user_model()
 
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    soft_delete = staticmethod(soft_delete_users)
     list_display = (
         'id',
         'first_name',
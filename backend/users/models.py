@@ -5,6 +5,9 @@ from django.db import models
 
 
 class CustomUserManager(BaseUserManager):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
     def create_user(self, email, username, first_name,
                     last_name, password):
         if not email:
@@ -55,11 +58,15 @@ class CustomUser(AbstractUser):
     is_active = models.BooleanField(default=True)
     is_admin = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(
+        'deleted at', null=True, blank=True, editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
 
     objects = CustomUserManager()
+    all_objects = models.Manager()
 
     def has_perm(self, perm, obj=None):
         return True